@@ -4,186 +4,110 @@
 Berechnet Kern-Deskriptivstatistik für GPU-Bug-Analyse (Schritt C).
 """
 
-import pandas as pd
-import numpy as np
-import sys
 from pathlib import Path
 
-# Optional: Wilson CI
-try:
-    from statsmodels.stats.proportion import proportion_confint
-    HAS_STATSMODELS = True
-except ImportError:
-    HAS_STATSMODELS = False
+from buildcache import BuildCache, code_digest, cube_fingerprint, fingerprint
+from ingest import load_coded, source_hash
+from cube import LABEL_DIMS, ContingencyCube
+from intervals import pct_ci_columns
+from schema import CTCLASS_ORDER
+from tables import DIST_VALUES, TableSchema, tag_table, write_table
 
+# Konfidenzintervalle: "wilson", "agresti_coull" oder "clopper_pearson" (siehe intervals.py)
+CI_METHOD = 'wilson'
 
-def normalize_column_name(col):
-    """Normalisiert Spaltennamen: strip, lowercase, spaces->underscore, BOM entfernen."""
-    col = col.strip().lower()
-    col = col.replace('\ufeff', '')  # BOM
-    col = col.replace(' ', '_')
-    return col
 
+# (Kategorie, Ausgabe-Präfix, Einschränkung) – jeweils overall und by_project
+DISTRIBUTIONS = [
+    ('ctclass', 'c_ctclass', None),
+    ('stacklayer', 'c_stacklayer', None),
+    ('bugtype', 'c_bugtype', None),
+    ('ctsubtype_norm', 'c_b_subtype', {'ctclass': 'B'}),  # nur CTClass == "B"
+]
 
-def find_col(df, candidates):
+# Code, von dem die c_*-Tabellen abhängen (Fingerprint im Build-Cache, siehe buildcache.py)
+HERE = Path(__file__).resolve().parent
+CODE = [Path(__file__).resolve()] + [HERE / f for f in ['cube.py', 'intervals.py', 'schema.py', 'ingest.py',
+                                                        'tables.py']]
+
+
+def distribution_table(cube, category_col, by_project=False, where=None):
     """
-    Findet die erste passende Spalte aus einer Liste von Kandidaten.
-    Gibt den tatsächlichen Spaltennamen zurück oder None.
+    Count + Prozent + 95%-CI (CI_METHOD) für eine Kategorie aus dem Cube (ein Issue =
+    eine Zeile, uid ist nach dem Ingest eindeutig), als typisierte Long-Tabelle
+    mit Schema (siehe tables.py).
     """
-    norm_cols = {normalize_column_name(c): c for c in df.columns}
-    for candidate in candidates:
-        norm_candidate = normalize_column_name(candidate)
-        if norm_candidate in norm_cols:
-            return norm_cols[norm_candidate]
-    return None
+    dims = ['project', category_col] if by_project else [category_col]
+    if by_project:
+        result = cube.to_frame(['project', category_col], where)
+        totals = cube.to_frame(['project'], where, dropna=True, name='total')
+        result = result.merge(totals, on='project')
+    else:
+        result = cube.to_frame([category_col], where)
+        result['total'] = cube.marginal([], where).item()
+    
+    result['percent'] = (result['count'] / result['total'] * 100).round(1)
+    result = result.assign(**pct_ci_columns(result['count'], result['total'], method=CI_METHOD))
+    return tag_table(result, TableSchema('long', tuple(dims), DIST_VALUES))
 
 
-def load_and_prepare(filepath, required_cols, optional_cols=None, gpu_filter=False):
+def compute_distribution(cube, category_col, output_prefix, by_project=False, where=None, cache=None):
     """
-    Lädt CSV, normalisiert Spalten, entfernt doppelte Header, dedupliziert.
+    Schreibt distribution_table als <prefix>_overall / <prefix>_by_project; Rückgabe:
+    die Dateien. Mit cache nur neu, wenn sich ihre Zählungen (oder Code/CI_METHOD)
+    geändert haben.
     """
-    df = pd.read_csv(filepath, encoding='utf-8-sig', dtype=str)
-    
-    # Spaltennamen normalisieren
-    df.columns = [normalize_column_name(c) for c in df.columns]
-    
-    # Doppelte Header entfernen (nur für issueid/project prüfen)
-    if 'issueid' in df.columns:
-        df = df[df['issueid'].str.strip().str.lower() != 'issueid']
-    if 'project' in df.columns:
-        df = df[df['project'].str.strip().str.lower() != 'project']
-    
-    df = df.reset_index(drop=True)
-    
-    # Required columns prüfen
-    missing = [col for col in required_cols if col not in df.columns]
-    if missing:
-        print(f"FEHLER in {filepath}: Fehlende Required-Spalten: {missing}")
-        print(f"Verfügbare Spalten: {list(df.columns)}")
-        sys.exit(1)
-    
-    # GPU-Filter für Qiskit
-    if gpu_filter:
-        if 'gpu_relevant' not in df.columns:
-            print(f"FEHLER in {filepath}: 'gpu_relevant' Spalte für Filter fehlt")
-            sys.exit(1)
-        # "X" bedeutet True
-        df = df[df['gpu_relevant'].str.strip().str.upper() == 'X'].copy()
-    
-    # Nach IssueID deduplizieren (keep="last")
-    df = df.drop_duplicates(subset=['issueid'], keep='last')
-    
-    return df
+    stem = f"{output_prefix}_{'by_project' if by_project else 'overall'}"
+    filename = f"{stem}.csv"
+    dims = ['project', category_col] if by_project else [category_col]
+    fp = cube_fingerprint(cube, dims, where, code_digest(*CODE), CI_METHOD)
+    if cache is not None and cache.fresh(filename, fp):
+        return cache.outputs(filename)
 
+    paths = write_table(distribution_table(cube, category_col, by_project, where), stem)
+    if cache is not None:
+        cache.record(filename, fp, paths)
+    return paths
 
-def wilson_ci(count, total, alpha=0.05):
-    """Berechnet Wilson-CI für eine Proportion."""
-    if not HAS_STATSMODELS or total == 0:
-        return np.nan, np.nan
-    ci_low, ci_high = proportion_confint(count, total, alpha=alpha, method='wilson')
-    return ci_low * 100, ci_high * 100
 
+def active_distributions(cube):
+    """DISTRIBUTIONS ohne die, deren Einschränkung keine Issues übrig lässt."""
+    for category_col, prefix, where in DISTRIBUTIONS:
+        if where and cube.marginal([], where).item() == 0:
+            print(f"WARNUNG: Keine Issues mit {where} gefunden, {prefix} übersprungen.")
+            continue
+        yield category_col, prefix, where
 
-def compute_distribution(df, group_col, category_col, output_prefix, by_project=False):
-    """
-    Berechnet Count + Prozent (+ optional Wilson-CI) für eine Kategorie.
-    """
-    if by_project:
-        grouped = df.groupby(['project', category_col], dropna=False).size().reset_index(name='count')
-        totals = df.groupby('project')['uid'].nunique().reset_index(name='total')
-        result = grouped.merge(totals, on='project')
-        result['percent'] = (result['count'] / result['total'] * 100).round(1)
-        
-        if HAS_STATSMODELS:
-            result['pct_ci_low'] = result.apply(
-                lambda r: wilson_ci(r['count'], r['total'])[0], axis=1
-            ).round(1)
-            result['pct_ci_high'] = result.apply(
-                lambda r: wilson_ci(r['count'], r['total'])[1], axis=1
-            ).round(1)
-        
-        filename = f"{output_prefix}_by_project.csv"
-    else:
-        grouped = df.groupby(category_col, dropna=False).size().reset_index(name='count')
-        total = df['uid'].nunique()
-        grouped['total'] = total
-        grouped['percent'] = (grouped['count'] / total * 100).round(1)
-        
-        if HAS_STATSMODELS:
-            grouped['pct_ci_low'] = grouped.apply(
-                lambda r: wilson_ci(r['count'], r['total'])[0], axis=1
-            ).round(1)
-            grouped['pct_ci_high'] = grouped.apply(
-                lambda r: wilson_ci(r['count'], r['total'])[1], axis=1
-            ).round(1)
-        
-        result = grouped
-        filename = f"{output_prefix}_overall.csv"
-    
-    result.to_csv(filename, index=False)
-    return filename
+
+def distribution_tables(cube):
+    """Alle c_*-Tabellen im Speicher (Name -> typisierte Tabelle), für pipeline.py."""
+    return {f"{prefix}_{'by_project' if by_project else 'overall'}":
+            distribution_table(cube, category_col, by_project, where)
+            for category_col, prefix, where in active_distributions(cube)
+            for by_project in (False, True)}
 
 
 def main():
-    # Dateipfade
-    cudaq_file = Path("./Cuda-Q/cudaq_issues_raw.csv")
-    qiskit_file = Path("./qskit/github_issues.csv")
-    
-    # Required columns (normalisiert)
-    required_base = ['project', 'issueid', 'bugtype', 'stacklayer', 'ctclass']
-    
-    # CUDA-Q: alle Issues
-    print("Lade CUDA-Q Daten...")
-    cudaq_df = load_and_prepare(
-        cudaq_file,
-        required_cols=required_base,
-        gpu_filter=False
-    )
-    
-    # Qiskit: nur GPU-relevante Issues
-    print("Lade Qiskit Daten (GPU-Filter)...")
-    qiskit_required = required_base + ['gpu_relevant']
-    qiskit_df = load_and_prepare(
-        qiskit_file,
-        required_cols=qiskit_required,
-        gpu_filter=True
-    )
-    
-    # Kombinieren
-    df = pd.concat([cudaq_df, qiskit_df], ignore_index=True)
-    
-    # UID erstellen (project#issueid) für repo-übergreifendes Zählen
-    df['uid'] = df['project'].astype(str).str.strip() + '#' + df['issueid'].astype(str).str.strip()
-    
-    # Data cleaning
-    df['ctclass'] = df['ctclass'].astype(str).str.strip().str.upper()
-    df['bugtype'] = df['bugtype'].astype(str).str.strip()
-    df['stacklayer'] = df['stacklayer'].astype(str).str.strip()
+    # Unveränderte Quelldaten + unveränderter Code: nichts zu tun
+    cache = BuildCache()
+    stage_fp = fingerprint(source_hash(), code_digest(*CODE), CI_METHOD, DISTRIBUTIONS)
+    if cache.fresh('02_basic', stage_fp):
+        print("c_*-Tabellen aktuell (Build-Cache), nichts zu tun.")
+        return
+
+    # CUDA-Q: alle Issues, Qiskit: nur GPU-relevante Issues (siehe ingest.py)
+    print("Lade Daten (ingest cache)...")
+    df = load_coded()
     
     # CTClass validation
-    valid_ctclass = {'A', 'B', 'C'}
-    invalid_ctclass = df[~df['ctclass'].isin(valid_ctclass)]
+    invalid_ctclass = df[~df['ctclass'].isin(CTCLASS_ORDER)]
     if len(invalid_ctclass) > 0:
-        invalid_counts = invalid_ctclass['ctclass'].value_counts()
+        invalid_counts = invalid_ctclass['ctclass'].value_counts(dropna=False).loc[lambda c: c > 0]
         print(f"WARNUNG: Ungültige CTClass-Werte gefunden: {invalid_counts.to_dict()}")
     
-    # CTSubType-Spalte finden (flexible Namen)
-    ctsubtype_candidates = ['ctsubtype', 'ct_subtype', 'subclass', 'subtype', 'b1/b2']
-    ctsubtype_col = find_col(df, ctsubtype_candidates)
-    
-    if ctsubtype_col:
-        # B1/B2/Missing Normalisierung
-        df['ctsubtype_norm'] = df[ctsubtype_col].fillna('').astype(str).str.strip().str.upper()
-        df.loc[df['ctsubtype_norm'].str.startswith('B1'), 'ctsubtype_norm'] = 'B1'
-        df.loc[df['ctsubtype_norm'].str.startswith('B2'), 'ctsubtype_norm'] = 'B2'
-        df.loc[~df['ctsubtype_norm'].isin(['B1', 'B2']), 'ctsubtype_norm'] = 'Missing'
-    else:
-        print("WARNUNG: Keine CTSubType-Spalte gefunden. B-SubType-Analysen werden übersprungen.")
-        df['ctsubtype_norm'] = 'Missing'
-    
     # N unique Issues
-    n_cudaq = cudaq_df['issueid'].nunique()
-    n_qiskit = qiskit_df['issueid'].nunique()
+    n_cudaq = df.loc[df['source'] == 'cudaq', 'issueid'].nunique()
+    n_qiskit = df.loc[df['source'] == 'qiskit', 'issueid'].nunique()
     n_total = df['uid'].nunique()
     
     print(f"\nN unique Issues:")
@@ -195,35 +119,19 @@ def main():
     # Auswertungen
     outputs = []
     
-    # 1) CTClass
-    outputs.append(compute_distribution(df, 'project', 'ctclass', 'c_ctclass', by_project=False))
-    outputs.append(compute_distribution(df, 'project', 'ctclass', 'c_ctclass', by_project=True))
+    # Ein Scan über die Integer-Codes, alle c_*-Tabellen sind Marginalien davon
+    cube = ContingencyCube.from_frame(df, LABEL_DIMS)
     
-    # 2) StackLayer
-    outputs.append(compute_distribution(df, 'project', 'stacklayer', 'c_stacklayer', by_project=False))
-    outputs.append(compute_distribution(df, 'project', 'stacklayer', 'c_stacklayer', by_project=True))
+    for category_col, prefix, where in active_distributions(cube):
+        outputs.extend(compute_distribution(cube, category_col, prefix, by_project=False, where=where, cache=cache))
+        outputs.extend(compute_distribution(cube, category_col, prefix, by_project=True, where=where, cache=cache))
     
-    # 3) BugType
-    outputs.append(compute_distribution(df, 'project', 'bugtype', 'c_bugtype', by_project=False))
-    outputs.append(compute_distribution(df, 'project', 'bugtype', 'c_bugtype', by_project=True))
+    cache.record('02_basic', stage_fp, outputs)
+    cache.save()
     
-    # 4) B-SubType (nur CTClass == "B")
-    if ctsubtype_col:
-        df_b = df[df['ctclass'] == 'B'].copy()
-        if len(df_b) > 0:
-            outputs.append(compute_distribution(df_b, 'project', 'ctsubtype_norm', 'c_b_subtype', by_project=False))
-            outputs.append(compute_distribution(df_b, 'project', 'ctsubtype_norm', 'c_b_subtype', by_project=True))
-        else:
-            print("WARNUNG: Keine Issues mit CTClass == 'B' gefunden.")
-    else:
-        print("WARNUNG: B-SubType-Analysen übersprungen (Spalte fehlt).")
-    
-    print("Geschriebene Dateien:")
+    print("Dateien (unveränderte aus dem Build-Cache übersprungen):")
     for output in outputs:
         print(f"  - {output}")
-    
-    if not HAS_STATSMODELS:
-        print("\nHINWEIS: statsmodels nicht verfügbar. Wilson-CIs wurden nicht berechnet.")
 
 
 if __name__ == '__main__':
@@ -4,75 +4,63 @@
 Erzeugt Kreuztabellen (Story-Analysen) für GPU-Bug-Analyse (Schritt D).
 """
 
-import pandas as pd
-import sys
 from pathlib import Path
 
+import pandas as pd
+
+from buildcache import BuildCache, code_digest, cube_fingerprint, fingerprint
+from cube import LABEL_DIMS, ContingencyCube, row_percent
+from ingest import load_coded, source_hash
+from intervals import pct_ci_columns
+from posthoc import posthoc_frame
+from tables import CI_VALUES, TableSchema, tag_table, write_table
+
+# Konfidenzintervalle der Zeilenprozente (siehe intervals.py)
+CI_METHOD = 'wilson'
+
+# (Zeilen-, Spaltenvariable, Ausgabe-Präfix, overall/by_project)
+CROSSTABS = [
+    ('stacklayer', 'ctclass', 'd_layer_x_ctclass', (False, True)),
+    ('bugtype', 'ctclass', 'd_bugtype_x_ctclass', (False, True)),
+    ('project', 'ctclass', 'd_project_x_ctclass', (False,)),
+]
 
-def normalize_column_name(col):
-    """Normalisiert Spaltennamen: strip, lowercase, spaces->underscore, BOM entfernen."""
-    col = col.strip().lower()
-    col = col.replace('\ufeff', '')  # BOM
-    col = col.replace(' ', '_')
-    return col
+# Code, von dem die d_*-Tabellen abhängen (Fingerprint im Build-Cache, siehe buildcache.py)
+HERE = Path(__file__).resolve().parent
+CODE = [Path(__file__).resolve()] + [HERE / f for f in ['cube.py', 'intervals.py', 'posthoc.py', 'multitest.py',
+                                                        'schema.py', 'ingest.py', 'tables.py']]
 
 
-def load_and_prepare(filepath, required_cols, gpu_filter=False):
+def crosstab_ci(counts_df, row_var, col_var, by_project=False):
     """
-    Lädt CSV, normalisiert Spalten, entfernt doppelte Header, dedupliziert.
+    Long format der Kreuztabelle: eine Zeile pro Zelle mit count, Zeilensumme,
+    Zeilenprozent und CI des Zeilenprozents.
     """
-    df = pd.read_csv(filepath, encoding='utf-8-sig', dtype=str)
-    
-    # Spaltennamen normalisieren
-    df.columns = [normalize_column_name(c) for c in df.columns]
-    
-    # Doppelte Header entfernen (nur für issueid/project prüfen)
-    if 'issueid' in df.columns:
-        df = df[df['issueid'].str.strip().str.lower() != 'issueid']
-    if 'project' in df.columns:
-        df = df[df['project'].str.strip().str.lower() != 'project']
-    
-    df = df.reset_index(drop=True)
-    
-    # Required columns prüfen
-    missing = [col for col in required_cols if col not in df.columns]
-    if missing:
-        print(f"FEHLER in {filepath}: Fehlende Required-Spalten: {missing}")
-        print(f"Verfügbare Spalten: {list(df.columns)}")
-        sys.exit(1)
-    
-    # GPU-Filter für Qiskit
-    if gpu_filter:
-        if 'gpu_relevant' not in df.columns:
-            print(f"FEHLER in {filepath}: 'gpu_relevant' Spalte für Filter fehlt")
-            sys.exit(1)
-        df = df[df['gpu_relevant'].str.strip().str.upper() == 'X'].copy()
-    
-    # Nach (Project, IssueID) deduplizieren (keep="last")
-    df = df.drop_duplicates(subset=['project', 'issueid'], keep='last')
-    
-    return df
+    id_vars = ['project', row_var] if by_project else [row_var]
+    long = counts_df.melt(id_vars=id_vars, var_name=col_var, value_name='count')
+    long['row_total'] = long.groupby(id_vars, observed=True)['count'].transform('sum')
+    long['percent'] = (long['count'] / long['row_total'] * 100).round(1)
+    long = long.assign(**pct_ci_columns(long['count'], long['row_total'], method=CI_METHOD))
+    return long.sort_values(id_vars, kind='stable')
 
 
-def save_crosstab(df, row_var, col_var, prefix, by_project=False):
+def crosstab_tables(cube, row_var, col_var, prefix, by_project=False):
     """
-    Erstellt Kreuztabelle (counts und row-wise percentages) und speichert als CSV.
+    Kreuztabelle (counts, row-wise percentages und deren CIs) als Sicht auf den
+    Contingency-Cube, dazu die Post-hoc-Statistik je Zelle (adjustierte Residuen,
+    Holm-korrigierte p-Werte, χ²-Beiträge; siehe posthoc.py). Rückgabe: Name ->
+    typisierte Tabelle (wide counts/pct, long ci/posthoc; siehe tables.py).
     """
+    kind = 'by_project' if by_project else 'overall'
+    dims = ['project', row_var, col_var] if by_project else [row_var, col_var]
     if by_project:
-        # Gruppieren nach project
-        projects = sorted(df['project'].dropna().unique())
-        
         all_counts = []
         all_pcts = []
         
-        for proj in projects:
-            df_proj = df[df['project'] == proj]
-            ct_counts = pd.crosstab(df_proj[row_var], df_proj[col_var])
+        for proj in cube.labels('project'):
+            ct_counts = cube.crosstab(row_var, col_var, where={'project': proj})
+            ct_pct = row_percent(ct_counts)
             ct_counts['project'] = proj
-            
-            row_sums = ct_counts.drop('project', axis=1).sum(axis=1).replace(0, pd.NA)
-            ct_pct = ct_counts.drop('project', axis=1).div(row_sums, axis=0) * 100
-            ct_pct = ct_pct.round(1)
             ct_pct['project'] = proj
             
             all_counts.append(ct_counts)
@@ -80,58 +68,87 @@ def save_crosstab(df, row_var, col_var, prefix, by_project=False):
         
         counts_df = pd.concat(all_counts).reset_index()
         pcts_df = pd.concat(all_pcts).reset_index()
-        
-        counts_file = f"{prefix}_by_project_counts.csv"
-        pcts_file = f"{prefix}_by_project_pct.csv"
     else:
-        ct_counts = pd.crosstab(df[row_var], df[col_var])
-        ct_pct = ct_counts.div(ct_counts.sum(axis=1), axis=0) * 100
-        ct_pct = ct_pct.round(1)
+        ct_counts = cube.crosstab(row_var, col_var)
+        ct_pct = row_percent(ct_counts)
         
         counts_df = ct_counts.reset_index()
         pcts_df = ct_pct.reset_index()
-        
-        counts_file = f"{prefix}_overall_counts.csv"
-        pcts_file = f"{prefix}_overall_pct.csv"
-    
-    counts_df.to_csv(counts_file, index=False)
-    pcts_df.to_csv(pcts_file, index=False)
     
-    return [counts_file, pcts_file]
+    keys = (row_var, 'project') if by_project else (row_var,)
+    levels = tuple(c for c in counts_df.columns if c not in keys)
+    ci = crosstab_ci(counts_df, row_var, col_var, by_project)
+    # alle Projekte in einem Batch (gleiches Kategorienraster aus dem Cube)
+    posthoc = posthoc_frame(cube, row_var, col_var, by='project' if by_project else None)
+    return {
+        f"{prefix}_{kind}_counts": tag_table(counts_df, TableSchema('wide', keys, levels, 'count')),
+        f"{prefix}_{kind}_pct": tag_table(pcts_df, TableSchema('wide', keys, levels, 'percent')),
+        f"{prefix}_{kind}_ci": tag_table(ci, TableSchema('long', tuple(dims), CI_VALUES)),
+        f"{prefix}_{kind}_posthoc": tag_table(posthoc, TableSchema('long', tuple(dims),
+                                                                   tuple(posthoc.columns[len(dims):]))),
+    }
+
+
+def save_crosstab(cube, row_var, col_var, prefix, by_project=False, cache=None):
+    """
+    Schreibt die Tabellen von crosstab_tables; Rückgabe: die Dateien. Mit cache nur,
+    wenn sich die zugrunde liegenden Zählungen geändert haben.
+    """
+    kind = 'by_project' if by_project else 'overall'
+    key = f"{prefix}_{kind}_counts.csv"
+    dims = ['project', row_var, col_var] if by_project else [row_var, col_var]
+    fp = cube_fingerprint(cube, dims, None, code_digest(*CODE), CI_METHOD)
+    if cache is not None and cache.fresh(key, fp):
+        return cache.outputs(key)
+
+    paths = []
+    for stem, table in crosstab_tables(cube, row_var, col_var, prefix, by_project).items():
+        paths += write_table(table, stem)
+    if cache is not None:
+        cache.record(key, fp, paths)
+    return paths
+
+
+def audit_unique_labels(cube):
+    """Anzahl beobachteter StackLayer/BugType-Labels und Issues, overall und pro Projekt."""
+    rows = []
+    for proj in [None] + cube.labels('project'):
+        where = {'project': proj} if proj is not None else None
+        rows.append({
+            'project': 'OVERALL' if proj is None else proj,
+            'n_unique_stacklayer': len(cube.labels('stacklayer', where)),
+            'n_unique_bugtype': len(cube.labels('bugtype', where)),
+            'n_issues': cube.marginal([], where).item(),
+        })
+    audit = pd.DataFrame(rows)
+    return tag_table(audit, TableSchema('long', ('project',), tuple(audit.columns[1:])))
+
+
+def cross_tables(cube):
+    """Alle d_*-Tabellen im Speicher (Name -> typisierte Tabelle), für pipeline.py."""
+    tables = {}
+    for row_var, col_var, prefix, kinds in CROSSTABS:
+        for by_project in kinds:
+            tables.update(crosstab_tables(cube, row_var, col_var, prefix, by_project))
+    tables['d_audit_unique_labels'] = audit_unique_labels(cube)
+    return tables
 
 
 def main():
-    # Dateipfade
-    cudaq_file = Path("./Cuda-Q/cudaq_issues_raw.csv")
-    qiskit_file = Path("./qskit/github_issues.csv")
-    
-    # Required columns (normalisiert)
-    required_base = ['project', 'issueid', 'stacklayer', 'bugtype', 'ctclass']
-    
-    # CUDA-Q: alle Issues
-    print("Lade CUDA-Q Daten...")
-    cudaq_df = load_and_prepare(cudaq_file, required_cols=required_base, gpu_filter=False)
-    
-    # Qiskit: nur GPU-relevante Issues
-    print("Lade Qiskit Daten (GPU-Filter)...")
-    qiskit_required = required_base + ['gpu_relevant']
-    qiskit_df = load_and_prepare(qiskit_file, required_cols=qiskit_required, gpu_filter=True)
-    
-    # Kombinieren
-    df = pd.concat([cudaq_df, qiskit_df], ignore_index=True)
-    
-    # UID erstellen (project#issueid)
-    df['uid'] = df['project'].astype(str).str.strip() + '#' + df['issueid'].astype(str).str.strip()
-    
-    # Labels cleanen
-    df['ctclass'] = df['ctclass'].astype(str).str.strip().str.upper()
-    df['stacklayer'] = df['stacklayer'].astype(str).str.strip()
-    df['bugtype'] = df['bugtype'].astype(str).str.strip()
-    df['project'] = df['project'].astype(str).str.strip()
+    # Unveränderte Quelldaten + unveränderter Code: nichts zu tun
+    cache = BuildCache()
+    stage_fp = fingerprint(source_hash(), code_digest(*CODE), CI_METHOD)
+    if cache.fresh('03_cross', stage_fp):
+        print("d_*-Tabellen aktuell (Build-Cache), nichts zu tun.")
+        return
+
+    # CUDA-Q: alle Issues, Qiskit: nur GPU-relevante Issues (siehe ingest.py)
+    print("Lade Daten (ingest cache)...")
+    df = load_coded()
     
     # N unique Issues
-    n_cudaq = cudaq_df['issueid'].nunique()
-    n_qiskit = qiskit_df['issueid'].nunique()
+    n_cudaq = df.loc[df['source'] == 'cudaq', 'issueid'].nunique()
+    n_qiskit = df.loc[df['source'] == 'qiskit', 'issueid'].nunique()
     n_total = df['uid'].nunique()
     
     print(f"\nN unique Issues:")
@@ -140,41 +157,28 @@ def main():
     print(f"  Total: {n_total}")
     print()
     
+    # Ein Zählvorgang (np.bincount), alle d_*-Tabellen sind Sichten darauf
+    cube = ContingencyCube.from_frame(df, LABEL_DIMS)
+    
     # Outputs
     outputs = []
     
-    # 1) StackLayer × CTClass
-    outputs.extend(save_crosstab(df, 'stacklayer', 'ctclass', 'd_layer_x_ctclass', by_project=False))
-    outputs.extend(save_crosstab(df, 'stacklayer', 'ctclass', 'd_layer_x_ctclass', by_project=True))
-    
-    # 2) BugType × CTClass
-    outputs.extend(save_crosstab(df, 'bugtype', 'ctclass', 'd_bugtype_x_ctclass', by_project=False))
-    outputs.extend(save_crosstab(df, 'bugtype', 'ctclass', 'd_bugtype_x_ctclass', by_project=True))
-    
-    # 3) Project × CTClass
-    outputs.extend(save_crosstab(df, 'project', 'ctclass', 'd_project_x_ctclass', by_project=False))
+    # 1) StackLayer × CTClass, 2) BugType × CTClass, 3) Project × CTClass
+    for row_var, col_var, prefix, kinds in CROSSTABS:
+        for by_project in kinds:
+            outputs.extend(save_crosstab(cube, row_var, col_var, prefix, by_project=by_project, cache=cache))
     
     # 4) Audit: Unique Labels
-    audit_overall = pd.DataFrame([{
-        'project': 'OVERALL',
-        'n_unique_stacklayer': df['stacklayer'].nunique(),
-        'n_unique_bugtype': df['bugtype'].nunique(),
-        'n_issues': df['uid'].nunique()
-    }])
-    
-    audit_by_project = df.groupby('project').agg({
-        'stacklayer': 'nunique',
-        'bugtype': 'nunique',
-        'uid': 'nunique'
-    }).reset_index()
-    audit_by_project.columns = ['project', 'n_unique_stacklayer', 'n_unique_bugtype', 'n_issues']
-    
-    audit_df = pd.concat([audit_overall, audit_by_project], ignore_index=True)
     audit_file = 'd_audit_unique_labels.csv'
-    audit_df.to_csv(audit_file, index=False)
-    outputs.append(audit_file)
+    audit_fp = cube_fingerprint(cube, ['project', 'stacklayer', 'bugtype'], None, code_digest(*CODE))
+    if not cache.fresh(audit_file, audit_fp):
+        cache.record(audit_file, audit_fp, write_table(audit_unique_labels(cube), 'd_audit_unique_labels'))
+    outputs.extend(cache.outputs(audit_file))
+    
+    cache.record('03_cross', stage_fp, outputs)
+    cache.save()
     
-    print("Geschriebene Dateien:")
+    print("Dateien (unveränderte aus dem Build-Cache übersprungen):")
     for output in outputs:
         print(f"  - {output}")
 
@@ -1,23 +1,37 @@
 
 """
 04_effect_sizes.py
-Step D (optional): χ² / (optional Fisher for 2x2) + Cramér’s V for key cross-tabs.
+Step D (optional): χ² / exact Fisher-Freeman-Halton (r x c) + Cramér’s V
+(with bias-corrected V and bootstrap CIs) for key cross-tabs.
 
-Inputs (CSV, relative paths):
-- ./Cuda-Q/cudaq_issues_raw.csv
-- ./qskit/github_issues.csv
+Inputs: the cleaned issue table from ingest.py
+(./Cuda-Q/cudaq_issues_raw.csv + ./qskit/github_issues.csv, cached as Parquet)
 
 Outputs:
 - e_effect_sizes.csv
+- e_association_pairs.csv   (all pairs of ASSOC_DIMS, Holm/BH-adjusted, see association.py)
+- e_association_matrix.csv  (Cramér's V matrix for a heatmap)
 """
 
 from __future__ import annotations
 
-import sys
+import os
 from pathlib import Path
+
 import pandas as pd
 import numpy as np
 
+import permutation
+from association import (ASSOC_DIMS, INT_COLUMNS, association_frame, association_matrix, association_pairs,
+                         pair_tables)
+from bootstrap import pool_bootstrap_v
+from buildcache import BuildCache, code_digest, fingerprint, table_fingerprint
+from exact_test import fisher_exact_rxc
+from ingest import load_coded, source_hash
+from permutation import expected_counts
+from resampling import Pending, PermutationResult, ResamplingPool, SequentialPending, mc_result
+from schema import CTCLASS_ORDER
+
 # --- optional SciPy (for chi2 p-values and Fisher exact) ---
 HAS_SCIPY = True
 try:
@@ -26,66 +40,31 @@ except Exception:
     HAS_SCIPY = False
 
 
-CUDAQ_FILE = Path("./Cuda-Q/cudaq_issues_raw.csv")
-QISKIT_FILE = Path("./qskit/github_issues.csv")
-
 # permutation settings (only used when expected counts are small OR SciPy is missing)
-N_PERM = 5000
+N_PERM = 5000  # maximum; with SEQ_HITS the test usually stops much earlier for large p
 RNG_SEED = 0
-
-
-def norm_col(c: str) -> str:
-    c = str(c).replace("\ufeff", "").strip().lower()
-    c = c.replace(" ", "_")
-    return c
-
-
-def load_and_prepare(path: Path, gpu_filter: bool) -> pd.DataFrame:
-    df = pd.read_csv(path, encoding="utf-8-sig", dtype=str)
-    df.columns = [norm_col(c) for c in df.columns]
-
-    # embedded header rows (targeted)
-    if "issueid" in df.columns:
-        df = df[df["issueid"].astype(str).str.strip().str.lower() != "issueid"]
-    if "project" in df.columns:
-        df = df[df["project"].astype(str).str.strip().str.lower() != "project"]
-
-    required = ["project", "issueid", "stacklayer", "bugtype", "ctclass"]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        print(f"FEHLER in {path}: Missing required columns: {missing}")
-        print(f"Available: {list(df.columns)}")
-        sys.exit(1)
-
-    if gpu_filter:
-        if "gpu_relevant" not in df.columns:
-            print(f"FEHLER in {path}: missing 'gpu_relevant' for GPU filter")
-            sys.exit(1)
-        df = df[df["gpu_relevant"].fillna("").astype(str).str.strip().str.upper() == "X"].copy()
-
-    # clean minimal
-    df["project"] = df["project"].astype(str).str.strip()
-    df["issueid"] = df["issueid"].astype(str).str.strip()
-    df["stacklayer"] = df["stacklayer"].astype(str).str.strip()
-    df["bugtype"] = df["bugtype"].astype(str).str.strip()
-    df["ctclass"] = df["ctclass"].astype(str).str.strip().str.upper()
-
-    # dedupe within file (safe)
-    df = df.drop_duplicates(subset=["project", "issueid"], keep="last")
-
-    # repo-unique key
-    df["uid"] = df["project"] + "#" + df["issueid"]
-    return df
-
-
-def expected_counts(table: np.ndarray) -> np.ndarray:
-    # expected under independence: (row_sum * col_sum) / N
-    n = table.sum()
-    if n == 0:
-        return np.zeros_like(table, dtype=float)
-    rsum = table.sum(axis=1, keepdims=True)
-    csum = table.sum(axis=0, keepdims=True)
-    return (rsum @ csum) / n
+# sequential stopping: stop after this many permutations reach the observed chi2 (None = always N_PERM)
+SEQ_HITS = 20
+# bootstrap CIs for Cramér's V: multinomial resamples per table, "bca" or "percentile"
+N_BOOT = 2000
+BOOT_CI = "bca"
+# worker processes for permutation runs; results do not depend on this number
+N_WORKERS = os.cpu_count() or 1
+# settings the cached results depend on
+PARAMS = (N_PERM, RNG_SEED, SEQ_HITS, N_BOOT, BOOT_CI, HAS_SCIPY)
+
+# the key cross-tabs of e_effect_sizes.csv: (row_var, col_var, name)
+TABLES = [
+    ("project", "ctclass", "Project × CTClass"),
+    ("stacklayer", "ctclass", "StackLayer × CTClass"),
+    ("bugtype", "ctclass", "BugType × CTClass"),
+]
+
+# code the e_* outputs depend on (build-cache fingerprint, see buildcache.py)
+HERE = Path(__file__).resolve().parent
+CODE = [Path(__file__).resolve()] + [HERE / f for f in [
+    "association.py", "bootstrap.py", "exact_test.py", "ingest.py", "multitest.py",
+    "permutation.py", "resampling.py", "schema.py"]]
 
 
 def chi2_stat(table: np.ndarray, exp: np.ndarray) -> float:
@@ -100,31 +79,25 @@ def cramers_v(chi2: float, n: int, r: int, c: int) -> float:
     return float(np.sqrt(chi2 / (n * (k - 1))))
 
 
-def permutation_pvalue(x: pd.Series, y: pd.Series, r: int, c: int, n_perm: int, seed: int) -> float:
-    # Permute y relative to x => valid permutation test for independence
-    rng = np.random.default_rng(seed)
-    table_obs = pd.crosstab(x, y).to_numpy()
-    exp_obs = expected_counts(table_obs)
-    chi2_obs = chi2_stat(table_obs, exp_obs)
+def permutation_pvalue(x: pd.Series, y: pd.Series, r: int, c: int, n_perm: int, seed: int,
+                       pool: ResamplingPool | None = None):
+    # Permute y relative to x => valid permutation test for independence.
+    # Without a pool: batched engine, same stream as the old per-permutation loop.
+    # With a pool: returns a Pending whose chunks (SeedSequence.spawn streams) run in parallel.
+    # SEQ_HITS stops early (Besag-Clifford) once the p-value is clearly large.
+    x, y = x.cat.codes.to_numpy(), y.cat.codes.to_numpy()
+    if pool is None:
+        return mc_result(permutation.permutation_pvalue(x, y, n_perm, seed), n_perm)
+    return pool.permutation_test(x, y, n_perm, seed, hits=SEQ_HITS)
 
-    y_vals = y.to_numpy(copy=True)
-    count_ge = 0
-    for _ in range(n_perm):
-        rng.shuffle(y_vals)
-        tab = pd.crosstab(x, y_vals).to_numpy()
-        exp = expected_counts(tab)
-        chi2_sim = chi2_stat(tab, exp)
-        if chi2_sim >= chi2_obs:
-            count_ge += 1
-    return (count_ge + 1) / (n_perm + 1)
 
-
-def analyze_table(df: pd.DataFrame, row_var: str, col_var: str, name: str) -> dict:
+def analyze_table(df: pd.DataFrame, row_var: str, col_var: str, name: str,
+                  pool: ResamplingPool | None = None) -> dict:
     # drop missing values for the two variables
     sub = df[[row_var, col_var, "uid"]].copy()
-    sub[row_var] = sub[row_var].replace("", pd.NA)
-    sub[col_var] = sub[col_var].replace("", pd.NA)
     sub = sub.dropna(subset=[row_var, col_var])
+    sub[row_var] = sub[row_var].cat.remove_unused_categories()
+    sub[col_var] = sub[col_var].cat.remove_unused_categories()
 
     n_used = sub["uid"].nunique()
     ct = pd.crosstab(sub[row_var], sub[col_var])
@@ -148,17 +121,27 @@ def analyze_table(df: pd.DataFrame, row_var: str, col_var: str, name: str) -> di
         min_exp = float(np.min(exp_s))
 
     v = cramers_v(chi2, n, r, c)
+    # bias-corrected V and its bootstrap CIs (a Pending on the pool, see resolve_pending)
+    v_boot = pool_bootstrap_v(pool, table, N_BOOT, RNG_SEED, method=BOOT_CI) if pool is not None and n > 1 else None
 
     # Fisher exact only for 2x2
     p_fisher = float("nan")
     if HAS_SCIPY and r == 2 and c == 2:
         _, p_fisher = fisher_exact(table)
 
+    # exact conditional test for any r x c (Monte Carlo when the table is too large)
+    p_exact, exact_method = float("nan"), ""
+    if n > 0 and r > 1 and c > 1:
+        exact = fisher_exact_rxc(table, seed=RNG_SEED, pool=pool)
+        p_exact, exact_method = exact.p_value, exact.method
+        if exact.reason:
+            exact_method += f" ({exact.reason})"
+
     # permutation p-value if expected counts small OR SciPy missing
     p_perm = float("nan")
     if (not HAS_SCIPY) or (min_exp < 5):
-        # build x,y series aligned with sub
-        p_perm = float(permutation_pvalue(sub[row_var], sub[col_var], r, c, N_PERM, RNG_SEED))
+        # build x,y series aligned with sub (a Pending when run on the pool, see resolve_pending)
+        p_perm = permutation_pvalue(sub[row_var], sub[col_var], r, c, N_PERM, RNG_SEED, pool)
 
     return {
         "test": name,
@@ -169,47 +152,134 @@ def analyze_table(df: pd.DataFrame, row_var: str, col_var: str, name: str) -> di
         "chi2": round(chi2, 4),
         "dof": dof,
         "p_chi2": p_chi2 if np.isnan(p_chi2) else round(p_chi2, 6),
-        "p_perm": p_perm if np.isnan(p_perm) else round(p_perm, 6),
+        "p_perm": p_perm,
+        "n_perm_used": float("nan"),
+        "p_perm_se": float("nan"),
         "p_fisher_2x2": p_fisher if np.isnan(p_fisher) else round(p_fisher, 6),
+        "p_exact": p_exact if np.isnan(p_exact) else float(f"{p_exact:.6g}"),
+        "p_exact_method": exact_method,
         "cramers_v": round(v, 4) if not np.isnan(v) else float("nan"),
+        "v_ci_low": float("nan"),
+        "v_ci_high": float("nan"),
+        "cramers_v_bc": float("nan"),
+        "v_bc_ci_low": float("nan"),
+        "v_bc_ci_high": float("nan"),
+        "v_boot": v_boot,
         "min_expected": round(min_exp, 4) if not np.isnan(min_exp) else float("nan"),
     }
 
 
-def main() -> None:
-    print("Loading data...")
-    cudaq = load_and_prepare(CUDAQ_FILE, gpu_filter=False)
-    qiskit = load_and_prepare(QISKIT_FILE, gpu_filter=True)
+def resolve_pending(results: list[dict]) -> list[dict]:
+    """Wait for permutation p-values and V bootstraps still running on the pool and round them like the others."""
+    for res in results:
+        boot = res.pop("v_boot", None)
+        if boot is not None:
+            boot = boot.result()
+            res["v_ci_low"], res["v_ci_high"] = round(boot.v_low, 4), round(boot.v_high, 4)
+            res["cramers_v_bc"] = round(boot.v_bc, 4)
+            res["v_bc_ci_low"], res["v_bc_ci_high"] = round(boot.v_bc_low, 4), round(boot.v_bc_high, 4)
+        perm = res["p_perm"]
+        if isinstance(perm, (Pending, SequentialPending)):
+            perm = perm.result()
+        if isinstance(perm, PermutationResult):
+            res["p_perm"] = round(perm.p_value, 6)
+            res["n_perm_used"] = perm.n_used
+            res["p_perm_se"] = round(perm.mc_se, 6)
+    return results
+
+
+def valid_ctclass(df: pd.DataFrame) -> pd.DataFrame:
+    """df without rows whose CTClass is not one of CTCLASS_ORDER (with a warning)."""
+    invalid = df.loc[~df["ctclass"].isin(CTCLASS_ORDER), "ctclass"].value_counts(dropna=False).loc[lambda c: c > 0]
+    if len(invalid) == 0:
+        return df
+    print(f"WARNUNG: invalid CTClass values dropped: {invalid.to_dict()}")
+    df = df[df["ctclass"].isin(CTCLASS_ORDER)].copy()
+    df["ctclass"] = df["ctclass"].cat.remove_unused_categories()
+    return df
+
+
+def effect_sizes(df: pd.DataFrame, cache: BuildCache | None = None,
+                 workers: int = N_WORKERS) -> dict[str, pd.DataFrame]:
+    """
+    The e_* tables (name -> DataFrame, rounded as written) from the ingest table.
+    With cache, tables whose counts did not change are taken from the build
+    cache instead of recomputed, and new results are recorded in it.
+    """
+    df = valid_ctclass(df)
+    code = code_digest(*CODE)
+    tables = pair_tables(association_frame(df), ASSOC_DIMS)
+    table_fps = [table_fingerprint(tables[row_var, col_var], code, PARAMS, name)
+                 for row_var, col_var, name in TABLES]
+    pairs_fp = fingerprint([table_fingerprint(table) for table in tables.values()], code, PARAMS)
+
+    def cached(key, fp):
+        return cache.value(key, fp) if cache is not None else None
+
+    # all tables' permutation chunks are queued before any result is awaited
+    with ResamplingPool(workers) as pool:
+        results = []
+        for (row_var, col_var, name), fp in zip(TABLES, table_fps):
+            res = cached(f"e_effect_sizes.csv:{name}", fp)
+            results.append(res if res is not None else analyze_table(df, row_var, col_var, name, pool))
+        records = cached("e_association_pairs.csv", pairs_fp)
+        if records is not None:
+            pairs = pd.DataFrame(records)
+        else:
+            pairs = association_pairs(tables, pool, N_PERM, RNG_SEED, hits=SEQ_HITS)
+        resolve_pending(results)
+
+    if cache is not None:
+        for (_, _, name), fp, res in zip(TABLES, table_fps, results):
+            cache.record(f"e_effect_sizes.csv:{name}", fp, outputs=[], value=res)
+        cache.record("e_association_pairs.csv", pairs_fp, outputs=[], value=pairs.to_dict("records"))
+
+    return {
+        "e_effect_sizes": pd.DataFrame(results).astype(INT_COLUMNS),
+        "e_association_pairs": pairs.round({"chi2": 4, "cramers_v": 4, "cramers_v_bc": 4, "min_expected": 4})
+                                    .astype(INT_COLUMNS),
+        "e_association_matrix": association_matrix(pairs, ASSOC_DIMS).round(4).reset_index(),
+    }
+
+
+def write_effect_sizes(tables: dict[str, pd.DataFrame], out_dir: Path = Path(".")) -> list[str]:
+    paths = []
+    for name, table in tables.items():
+        path = Path(out_dir) / f"{name}.csv"
+        table.to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
 
-    df = pd.concat([cudaq, qiskit], ignore_index=True)
 
-    # keep only valid CTClass
-    valid = {"A", "B", "C"}
-    invalid = df.loc[~df["ctclass"].isin(valid), "ctclass"].value_counts()
-    if len(invalid) > 0:
-        print(f"WARNUNG: invalid CTClass values dropped: {invalid.to_dict()}")
-        df = df[df["ctclass"].isin(valid)].copy()
+def main() -> None:
+    # unchanged sources, code and settings: nothing to do
+    cache = BuildCache()
+    stage_fp = fingerprint(source_hash(), code_digest(*CODE), PARAMS)
+    if cache.fresh("04", stage_fp):
+        print("e_* outputs up to date (build cache), nothing to do.")
+        return
+
+    print("Loading data...")
+    df = valid_ctclass(load_coded())
 
     # quick N
-    n_cudaq = int(cudaq["uid"].nunique())
-    n_qiskit = int(qiskit["uid"].nunique())
+    n_cudaq = int(df.loc[df["source"] == "cudaq", "uid"].nunique())
+    n_qiskit = int(df.loc[df["source"] == "qiskit", "uid"].nunique())
     n_total = int(df["uid"].nunique())
     print(f"N (uid unique): CUDA-Q={n_cudaq}, Qiskit(GPU)={n_qiskit}, Total={n_total}")
 
-    results = []
-    results.append(analyze_table(df, "project", "ctclass", "Project × CTClass"))
-    results.append(analyze_table(df, "stacklayer", "ctclass", "StackLayer × CTClass"))
-    results.append(analyze_table(df, "bugtype", "ctclass", "BugType × CTClass"))
-
-    out = pd.DataFrame(results)
-    out_file = "e_effect_sizes.csv"
-    out.to_csv(out_file, index=False)
+    # tables whose counts did not change are taken from the build cache instead of recomputed
+    outputs = write_effect_sizes(effect_sizes(df, cache))
+    cache.record("04", stage_fp, outputs)
+    cache.save()
 
-    print(f"Wrote: {out_file}")
+    print(f"Wrote: {', '.join(outputs)}")
     if not HAS_SCIPY:
         print("NOTE: SciPy not available -> chi2 p-values are NaN; permutation p-values were computed instead where applicable.")
     else:
-        print(f"NOTE: permutation p-values computed when min_expected < 5 (N_PERM={N_PERM}).")
+        print(f"NOTE: permutation p-values computed when min_expected < 5 (N_PERM={N_PERM} max, "
+              f"early stop after {SEQ_HITS} exceedances, {N_WORKERS} workers).")
+    print(f"NOTE: Cramér's V CIs from {N_BOOT} multinomial bootstrap tables ({BOOT_CI}).")
 
 
 if __name__ == "__main__":
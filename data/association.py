@@ -0,0 +1,147 @@
+"""
+association.py
+Association screen over all pairs of coded variables.
+
+The cross-tab of every pair of ASSOC_DIMS is counted on its own, with one
+2-D np.bincount over the category codes of the two columns (pair_tables),
+so the cost grows with the number of pairs, not with the product of all
+category counts. For each pair we compute χ²
+(uncorrected), dof, Cramér's V and its bias-corrected version, the
+smallest expected count and a p-value: the χ² p-value, or a permutation
+p-value (Besag-Clifford, on the shared ResamplingPool) when expected
+counts are small or SciPy is missing. The permutation runs of all pairs
+are queued before any result is awaited, so they run in parallel.
+
+The p-values are adjusted over the whole screen with Holm (family-wise
+error) and Benjamini-Hochberg (false discovery rate). Pairs with a single
+observed level on either side stay in the table with NaN statistics.
+gpu_relevant is not screened: after the Qiskit filter it is always true.
+NESTED_PAIRS (ctsubtype_norm is defined within ctclass, so their V is
+high by construction) keep their statistics, are flagged in `nested` and
+get no p-value, so they do not enter the adjustment.
+
+Outputs (written by 04.py):
+- tidy table, one row per pair (association_pairs)
+- V matrix over ASSOC_DIMS, symmetric with 1 on the diagonal, ready for a
+  heatmap (association_matrix)
+"""
+
+from __future__ import annotations
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from bootstrap import chi2_tables, cramers_v_batch
+from multitest import benjamini_hochberg, holm
+from permutation import expected_counts, table_codes
+from resampling import PermutationResult, ResamplingPool
+from schema import as_categorical
+
+# --- optional SciPy (for chi2 p-values) ---
+HAS_SCIPY = True
+try:
+    from scipy.stats import chi2 as chi2_dist
+except Exception:
+    HAS_SCIPY = False
+
+ASSOC_DIMS = ["project", "bugtype", "stacklayer", "ctclass", "ctsubtype_norm", "status_norm", "created_year"]
+# pairs where one variable is a refinement of the other
+NESTED_PAIRS = {("ctclass", "ctsubtype_norm")}
+MIN_EXPECTED = 5  # below this the permutation p-value is used
+# integer columns of association_pairs; NaN for pairs without a test, so nullable when written
+INT_COLUMNS = {"dof": "Int64", "n_perm_used": "Int64"}
+
+
+def association_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """The ingest table plus the derived categorical created_year."""
+    df = df.copy()
+    df["created_year"] = as_categorical(df["createdat_parsed"].dt.year.astype("Int64").astype("string"))
+    df["status_norm"] = as_categorical(df["status_norm"].astype("string").replace("", pd.NA))
+    return df
+
+
+def pair_tables(frame: pd.DataFrame, dims: list[str]) -> dict[tuple[str, str], pd.DataFrame]:
+    """
+    Cross-tab of every pair of dims like ContingencyCube.crosstab (missing
+    values dropped, only rows and columns with at least one issue), each
+    from one 2-D np.bincount of the two code arrays.
+    """
+    codes = {dim: frame[dim].cat.codes.to_numpy().astype(np.intp) for dim in dims}
+    cats = {dim: frame[dim].cat.categories for dim in dims}
+    tables = {}
+    for row_var, col_var in combinations(dims, 2):
+        x, y = codes[row_var], codes[col_var]
+        ok = (x >= 0) & (y >= 0)
+        r, c = len(cats[row_var]), len(cats[col_var])
+        counts = np.bincount(x[ok] * c + y[ok], minlength=r * c).reshape(r, c)
+        rows, cols = counts.sum(axis=1) > 0, counts.sum(axis=0) > 0
+        tables[row_var, col_var] = pd.DataFrame(
+            counts[np.ix_(rows, cols)].astype(np.int64),
+            index=pd.Index(cats[row_var][rows], name=row_var),
+            columns=pd.Index(cats[col_var][cols], name=col_var),
+        )
+    return tables
+
+
+def pair_stats(table: np.ndarray) -> dict:
+    r, c = table.shape
+    n = int(table.sum())
+    if n == 0 or r < 2 or c < 2:
+        return {"n": n, "shape_rxc": f"{r}x{c}", "chi2": np.nan, "dof": np.nan, "p_chi2": np.nan,
+                "cramers_v": np.nan, "cramers_v_bc": np.nan, "min_expected": np.nan}
+    chi2 = float(chi2_tables(table[None])[0])
+    dof = (r - 1) * (c - 1)
+    return {
+        "n": n,
+        "shape_rxc": f"{r}x{c}",
+        "chi2": chi2,
+        "dof": dof,
+        "p_chi2": float(chi2_dist.sf(chi2, dof)) if HAS_SCIPY else np.nan,
+        "cramers_v": float(cramers_v_batch(table[None])[0]),
+        "cramers_v_bc": float(cramers_v_batch(table[None], bias_corrected=True)[0]),
+        "min_expected": float(expected_counts(table).min()),
+    }
+
+
+def association_pairs(tables: dict[tuple[str, str], pd.DataFrame], pool: ResamplingPool,
+                      n_perm: int, seed: int, hits: int | None = None) -> pd.DataFrame:
+    """Tidy table of the pairs in `tables` (see pair_tables) with statistics and Holm/BH-adjusted p-values."""
+    rows, pending = [], []
+    for (row_var, col_var), table in tables.items():
+        table = table.to_numpy()
+        stats = pair_stats(table)
+        nested = (row_var, col_var) in NESTED_PAIRS
+        perm = None
+        if not nested and np.isfinite(stats["chi2"]) and (not HAS_SCIPY or stats["min_expected"] < MIN_EXPECTED):
+            perm = pool.permutation_test(*table_codes(table), n_perm, seed, hits=hits)
+        rows.append({"row_var": row_var, "col_var": col_var, "nested": nested, **stats})
+        pending.append(perm)
+
+    for res, perm in zip(rows, pending):
+        if perm is not None:
+            result: PermutationResult = perm.result()
+            res.update(p_perm=result.p_value, n_perm_used=result.n_used, p_value=result.p_value, p_source="perm")
+        elif res["nested"]:
+            res.update(p_perm=np.nan, n_perm_used=np.nan, p_value=np.nan, p_source="nested")
+        else:
+            source = "chi2" if np.isfinite(res["p_chi2"]) else ""
+            res.update(p_perm=np.nan, n_perm_used=np.nan, p_value=res["p_chi2"], p_source=source)
+
+    out = pd.DataFrame(rows)
+    out["p_holm"] = holm(out["p_value"])
+    out["p_bh"] = benjamini_hochberg(out["p_value"])
+    return out
+
+
+def association_matrix(pairs: pd.DataFrame, dims: list[str], value: str = "cramers_v") -> pd.DataFrame:
+    """Symmetric dims x dims matrix of `value` (1 on the diagonal for V)."""
+    pos = {dim: i for i, dim in enumerate(dims)}
+    mat = np.full((len(dims), len(dims)), np.nan)
+    i = pairs["row_var"].map(pos).to_numpy()
+    j = pairs["col_var"].map(pos).to_numpy()
+    mat[i, j] = mat[j, i] = pairs[value].to_numpy(dtype=float)
+    if value.startswith("cramers_v"):
+        np.fill_diagonal(mat, 1.0)
+    return pd.DataFrame(mat, index=pd.Index(dims, name="variable"), columns=dims)
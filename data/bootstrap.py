@@ -0,0 +1,138 @@
+"""
+bootstrap.py
+Vectorized bootstrap confidence intervals for Cramér's V.
+
+Bootstrap tables are drawn as whole batches by multinomial resampling of
+the observed cell proportions (one rng.multinomial call per chunk), and V
+and the bias-corrected V of Bergsma (2013) are computed for the whole
+(B, r, c) stack at once. Chunks run on a ResamplingPool, so the intervals
+do not depend on the worker count.
+
+Bias-corrected V:
+    phi2~ = max(0, chi2/n - (r-1)(c-1)/(n-1))
+    r~ = r - (r-1)^2/(n-1),  c~ = c - (c-1)^2/(n-1)
+    V~ = sqrt(phi2~ / min(r~-1, c~-1))
+
+Intervals:
+- "percentile"  alpha/2 and 1-alpha/2 quantiles of the bootstrap values
+- "bca"         bias-corrected and accelerated (default); the acceleration
+                comes from the jackknife, which for a table only has r*c
+                distinct leave-one-out tables (one per non-empty cell,
+                weighted by its count)
+
+Usage:
+    with ResamplingPool(workers=4) as pool:
+        res = pool_bootstrap_v(pool, table, n_boot=2000, seed=0).result()
+        # VBootstrap(v, v_bc, v_low, v_high, v_bc_low, v_bc_high)
+"""
+
+from __future__ import annotations
+
+from statistics import NormalDist
+from typing import NamedTuple
+
+import numpy as np
+
+from resampling import Pending, ResamplingPool
+
+N_BOOT = 2000
+CI_METHODS = ("percentile", "bca")
+
+
+class VBootstrap(NamedTuple):
+    v: float
+    v_bc: float  # bias-corrected V (Bergsma)
+    v_low: float
+    v_high: float
+    v_bc_low: float
+    v_bc_high: float
+
+
+def chi2_tables(tables: np.ndarray) -> np.ndarray:
+    """Uncorrected chi-square of each table in a (B, r, c) stack, each against its own margins."""
+    tables = np.asarray(tables, dtype=float)
+    n = tables.sum(axis=(1, 2))
+    exp = tables.sum(axis=2)[:, :, None] * tables.sum(axis=1)[:, None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exp = exp / n[:, None, None]
+        terms = np.where(exp > 0, (tables - exp) ** 2 / exp, 0.0)
+    return terms.sum(axis=(1, 2))
+
+
+def cramers_v_batch(tables: np.ndarray, bias_corrected: bool = False) -> np.ndarray:
+    """Cramér's V (or Bergsma's bias-corrected V) for each table of a (B, r, c) stack."""
+    tables = np.asarray(tables, dtype=float)
+    _, r, c = tables.shape
+    n = tables.sum(axis=(1, 2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        phi2 = chi2_tables(tables) / n
+        if not bias_corrected:
+            return np.sqrt(phi2 / (min(r, c) - 1))
+        phi2 = np.maximum(0.0, phi2 - (r - 1) * (c - 1) / (n - 1))
+        r_c = r - (r - 1) ** 2 / (n - 1)
+        c_c = c - (c - 1) ** 2 / (n - 1)
+        return np.sqrt(phi2 / np.minimum(r_c - 1, c_c - 1))
+
+
+def jackknife_tables(table: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct leave-one-out tables (one per non-empty cell) and how many observations give each."""
+    table = np.asarray(table)
+    cells = np.flatnonzero(table.ravel())
+    jack = np.repeat(table.ravel()[None, :], len(cells), axis=0)
+    jack[np.arange(len(cells)), cells] -= 1
+    return jack.reshape(len(cells), *table.shape), table.ravel()[cells].astype(float)
+
+
+def _interval(theta: float, boot: np.ndarray, jack: np.ndarray, weights: np.ndarray,
+              alpha: float, method: str) -> tuple[float, float]:
+    boot = boot[np.isfinite(boot)]
+    if len(boot) == 0 or not np.isfinite(theta):
+        return float("nan"), float("nan")
+    q = np.array([alpha / 2, 1 - alpha / 2])
+    if method == "bca":
+        nd = NormalDist()
+        prop = np.clip(((boot < theta).sum() + 0.5 * (boot == theta).sum()) / len(boot), 1e-10, 1 - 1e-10)
+        z0 = nd.inv_cdf(float(prop))
+        d = np.average(jack, weights=weights) - jack
+        denom = 6 * (weights * d**2).sum() ** 1.5
+        a = (weights * d**3).sum() / denom if denom > 0 else 0.0
+        z = np.array([nd.inv_cdf(float(p)) for p in q])
+        q = np.array([nd.cdf(float(v)) for v in z0 + (z0 + z) / (1 - a * (z0 + z))])
+    elif method != "percentile":
+        raise ValueError(f"unknown method {method!r} (known: {', '.join(CI_METHODS)})")
+    low, high = np.quantile(boot, q)
+    return float(low), float(high)
+
+
+def _bootstrap_chunk(table, seed_seq, n):
+    """V and bias-corrected V of n multinomial resamples of table, as an (n, 2) array."""
+    rng = np.random.default_rng(seed_seq)
+    table = np.asarray(table)
+    total = int(table.sum())
+    tables = rng.multinomial(total, table.ravel() / total, size=n).reshape(n, *table.shape)
+    return np.column_stack([cramers_v_batch(tables), cramers_v_batch(tables, bias_corrected=True)])
+
+
+def pool_bootstrap_v(pool: ResamplingPool, table, n_boot: int = N_BOOT, seed: int = 0,
+                     alpha: float = 0.05, method: str = "bca") -> Pending:
+    """Pending VBootstrap for one contingency table; the chunks run on pool."""
+    table = np.asarray(table, dtype=np.int64)
+    obs = table[None, :, :]
+    v, v_bc = float(cramers_v_batch(obs)[0]), float(cramers_v_batch(obs, bias_corrected=True)[0])
+    jack, weights = jackknife_tables(table)
+    jack_v, jack_bc = cramers_v_batch(jack), cramers_v_batch(jack, bias_corrected=True)
+
+    def merge(chunks):
+        boot = np.concatenate(chunks)
+        return VBootstrap(v, v_bc,
+                          *_interval(v, boot[:, 0], jack_v, weights, alpha, method),
+                          *_interval(v_bc, boot[:, 1], jack_bc, weights, alpha, method))
+
+    return pool.map_chunks(_bootstrap_chunk, (table,), n_boot, seed, merge)
+
+
+def bootstrap_v(table, n_boot: int = N_BOOT, seed: int = 0, alpha: float = 0.05,
+                method: str = "bca") -> VBootstrap:
+    """pool_bootstrap_v run in-process; same result as on a pool of any size."""
+    with ResamplingPool(1) as pool:
+        return pool_bootstrap_v(pool, table, n_boot, seed, alpha, method).result()
@@ -0,0 +1,152 @@
+"""
+buildcache.py
+Content-hash build cache: skip stages, tables and figures whose inputs did not change.
+
+Every build step has a key (usually its output file or stage name) and a
+fingerprint: the SHA-256 of everything it depends on, i.e. input file
+contents, parameters, the counts it is computed from and the source code of
+the modules involved. BuildCache stores the last fingerprint per key in
+./.build_cache/entries/, one JSON file per key (named by the key's hash),
+so stages running in parallel never overwrite each other's entries; a
+step is fresh when the fingerprint is unchanged and all its outputs still
+exist, and is then skipped.
+
+Steps are fingerprinted at two levels:
+- a whole stage by the ingest source hash (skips even loading the data),
+- each table by the cube counts it is derived from, so after one
+  annotation fix only the tables (and then figures) that see it change.
+
+Cached values (e.g. result rows of 04.py) can be stored with the
+fingerprint, so unchanged tables are not recomputed either.
+
+Usage:
+    cache = BuildCache()
+    fp = fingerprint(code_digest(__file__), CI_METHOD, counts)
+    if not cache.fresh("c_ctclass_overall.csv", fp):
+        ...write the file...
+        cache.record("c_ctclass_overall.csv", fp)
+    cache.save()
+
+FORCE=1 in the environment (or force=True) rebuilds everything.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = Path("./.build_cache")
+ENTRY_DIR = "entries"
+# bump when the fingerprint layout changes, so old entries are not reused
+CACHE_VERSION = 1
+
+
+def _update(h, part) -> None:
+    if isinstance(part, Path):
+        h.update(b"file:")
+        h.update(part.read_bytes() if part.exists() else b"<missing>")
+    elif isinstance(part, np.ndarray):
+        h.update(f"array:{part.dtype}:{part.shape}:".encode())
+        h.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, bytes):
+        h.update(part)
+    elif isinstance(part, (list, tuple)):
+        h.update(f"seq:{len(part)}:".encode())
+        for p in part:
+            _update(h, p)
+    elif isinstance(part, dict):
+        h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    else:
+        h.update(repr(part).encode())
+    h.update(b"\0")
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()  # numpy scalars in cached result rows
+    raise TypeError(f"not JSON serializable: {type(obj).__name__}")
+
+
+def fingerprint(*parts) -> str:
+    """SHA-256 over parts: Paths are hashed by content, arrays by dtype/shape/bytes, the rest by repr."""
+    h = hashlib.sha256(f"build-v{CACHE_VERSION}".encode())
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()
+
+
+def code_digest(*files) -> str:
+    """Hash of the given source files (pass __file__ and the files of the local modules used)."""
+    return fingerprint(*[Path(f) for f in files])
+
+
+def table_fingerprint(table, *extra) -> str:
+    """Fingerprint of a labelled cross-tab (DataFrame): its counts, row and column labels, and extra."""
+    labels = [list(map(str, table.index)), list(map(str, table.columns))]
+    return fingerprint(table.to_numpy(), labels, *extra)
+
+
+def cube_fingerprint(cube, dims: list[str], where: dict | None = None, *extra) -> str:
+    """Fingerprint of a table derived from the cube: its counts over dims, their labels, and extra."""
+    labels = [list(map(str, cube.categories[d])) for d in dims]
+    return fingerprint(cube.marginal(dims, where), labels, where, *extra)
+
+
+class BuildCache:
+    def __init__(self, cache_dir: Path = CACHE_DIR, force: bool | None = None):
+        self.dir = Path(cache_dir) / ENTRY_DIR
+        self.force = os.environ.get("FORCE", "") not in ("", "0") if force is None else force
+        self.entries = {}
+        self.recorded = set()  # keys to write on save()
+        for path in self.dir.glob("*.json"):
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue  # removed or unreadable: the step is rebuilt
+            self.entries[entry["key"]] = entry
+
+    def fresh(self, key: str, fp: str, outputs=None) -> bool:
+        """True if key was built with fingerprint fp and its outputs (default: [key]) still exist."""
+        entry = self.entries.get(key)
+        if self.force or entry is None or entry["fingerprint"] != fp:
+            return False
+        outputs = entry["outputs"] if outputs is None else outputs
+        return all(Path(p).exists() for p in outputs)
+
+    def value(self, key: str, fp: str):
+        """The value stored with key if its fingerprint is fp, else None."""
+        entry = self.entries.get(key)
+        if self.force or entry is None or entry["fingerprint"] != fp:
+            return None
+        return entry.get("value")
+
+    def outputs(self, key: str) -> list[str]:
+        """The outputs recorded for key (e.g. to report them when the step was skipped)."""
+        return self.entries[key]["outputs"] if key in self.entries else []
+
+    def record(self, key: str, fp: str, outputs=None, value=None) -> None:
+        self.entries[key] = {
+            "key": key,
+            "fingerprint": fp,
+            "outputs": [str(p) for p in ([key] if outputs is None else outputs)],
+            "value": value,
+        }
+        self.recorded.add(key)
+
+    def entry_path(self, key: str) -> Path:
+        return self.dir / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.json"
+
+    def save(self) -> None:
+        """Write the entries recorded since the last save, each through its own temp file."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for key in sorted(self.recorded):
+            text = json.dumps(self.entries[key], indent=1, default=_json_default)  # keeps column order of cached rows
+            with tempfile.NamedTemporaryFile("w", dir=self.dir, suffix=".tmp", delete=False, encoding="utf-8") as tmp:
+                tmp.write(text)
+            os.replace(tmp.name, self.entry_path(key))
+        self.recorded.clear()
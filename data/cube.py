@@ -0,0 +1,114 @@
+"""
+cube.py
+Contingency cube over the categorical label columns.
+
+ContingencyCube.from_frame(df, dims) scans the table once: the integer
+category codes of all dims are combined into one flat index and counted
+with a single np.bincount. Every grouping set (any subset of the dims,
+optionally restricted to one label of another dim, e.g. ctclass == "B") is
+then a sum over the other axes of that array, so the cost of extra tables
+does not depend on the number of rows.
+
+Missing values (code -1) get their own slot at the end of each axis, so
+views can keep them (groupby(dropna=False)) or drop them (crosstab).
+
+2-D/3-D crosstabs, marginals and row/column percentages are views of the
+same array: crosstab(row, col, where={"project": p}) replaces filtering the
+DataFrame per project and calling pd.crosstab on each piece.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# all label columns of the ingest table, in cube axis order
+LABEL_DIMS = ["project", "stacklayer", "bugtype", "ctclass", "ctsubtype_norm"]
+
+
+class ContingencyCube:
+    def __init__(self, counts: np.ndarray, dims: list[str], categories: dict[str, pd.Index]):
+        self.counts = counts
+        self.dims = list(dims)
+        self.categories = categories
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dims: list[str]) -> "ContingencyCube":
+        codes, shape, categories = [], [], {}
+        for dim in dims:
+            cat = df[dim].cat
+            k = len(cat.categories)
+            c = cat.codes.to_numpy().astype(np.intp)
+            codes.append(np.where(c < 0, k, c))  # missing -> last slot
+            shape.append(k + 1)
+            categories[dim] = cat.categories
+        flat = np.ravel_multi_index(codes, shape) if len(df) else np.zeros(0, dtype=np.intp)
+        counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        return cls(counts, dims, categories)
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def _select(self, where: dict | None) -> np.ndarray:
+        counts = self.counts
+        for dim, label in (where or {}).items():
+            axis = self.dims.index(dim)
+            idx = self.categories[dim].get_loc(label)
+            counts = np.take(counts, [idx], axis=axis)
+        return counts
+
+    def marginal(self, dims: list[str], where: dict | None = None, dropna: bool = False) -> np.ndarray:
+        """Counts over `dims` (in that order), summed over all other dims."""
+        counts = self._select(where)
+        other = tuple(i for i, d in enumerate(self.dims) if d not in dims)
+        counts = counts.sum(axis=other)
+        kept = [d for d in self.dims if d in dims]
+        counts = np.moveaxis(counts, [kept.index(d) for d in dims], range(len(dims)))
+        if dropna:
+            counts = counts[tuple(slice(0, -1) for _ in dims)]
+        return counts
+
+    def to_frame(self, dims: list[str], where: dict | None = None, dropna: bool = False,
+                 name: str = "count") -> pd.DataFrame:
+        """
+        Long table of the observed (count > 0) cells of `dims`, in category
+        order with missing last, like groupby(dims, observed=True).size().
+        """
+        counts = self.marginal(dims, where, dropna)
+        idx = np.nonzero(counts)
+        out = {}
+        for dim, codes in zip(dims, idx):
+            cats = self.categories[dim]
+            codes = np.where(codes == len(cats), -1, codes)
+            out[dim] = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(cats))
+        out[name] = counts[idx].astype(np.int64)
+        return pd.DataFrame(out)
+
+    def labels(self, dim: str, where: dict | None = None) -> list:
+        """Observed (count > 0, non-missing) labels of dim, in category order."""
+        counts = self.marginal([dim], where, dropna=True)
+        return list(self.categories[dim][counts > 0])
+
+    def crosstab(self, row: str, col: str, where: dict | None = None) -> pd.DataFrame:
+        """
+        Counts of row x col like pd.crosstab on the selected rows: missing
+        values dropped, only rows and columns with at least one issue.
+        """
+        counts = self.marginal([row, col], where, dropna=True)
+        rows, cols = counts.sum(axis=1) > 0, counts.sum(axis=0) > 0
+        return pd.DataFrame(
+            counts[np.ix_(rows, cols)].astype(np.int64),
+            index=pd.Index(self.categories[row][rows], name=row),
+            columns=pd.Index(self.categories[col][cols], name=col),
+        )
+
+
+def row_percent(table: pd.DataFrame, decimals: int = 1) -> pd.DataFrame:
+    row_sums = table.sum(axis=1).replace(0, np.nan)
+    return (table.div(row_sums, axis=0) * 100).round(decimals)
+
+
+def col_percent(table: pd.DataFrame, decimals: int = 1) -> pd.DataFrame:
+    col_sums = table.sum(axis=0).replace(0, np.nan)
+    return (table.div(col_sums, axis=1) * 100).round(decimals)
@@ -0,0 +1,512 @@
+"""
+exact_test.py
+Exact conditional (Fisher-Freeman-Halton) test for r x c tables.
+
+With both margins fixed, a table has the hypergeometric probability
+    P(T) = prod(R_i!) prod(C_j!) / (N! prod(n_ij!))
+and the p-value is the total probability of all tables with these margins
+that are at most as probable as the observed one (relative tolerance 1e-7
+for ties, as in R's fisher.test).
+
+The tables are enumerated with the network algorithm (Mehta & Patel): rows
+are filled one at a time, and a node is the multiset of column sums still
+to be filled, so all partial tables that leave the same column sums share
+one node. Each node keeps its distinct "past" statistics (sum of log n_ij!
+of the rows filled so far) with their path counts. Before a node is
+expanded, every past value is checked against bounds for the rest of the
+table:
+- even the most probable completion is at most as probable as the observed
+  table -> all completions count; their total probability is closed-form;
+- even the least probable completion is more probable -> none count.
+Only undecided values are carried to the next row. The last MEET_ROWS rows
+are not expanded path by path: for each node there, the statistics of all
+its completions are enumerated once (memoized, merged like the past values)
+and sorted, and every past value is resolved with one searchsorted into
+their suffix sums (meet in the middle).
+
+Tables with two rows or two columns take the one-margin recursion instead:
+a node is the part of the smaller column sum still to be filled (one
+integer), so a row has at most that many + 1 nodes; the bounds and the
+expansion of all (node, past value) pairs of a row run as whole arrays.
+This keeps 2 x c and r x 2 tables exact up to N in the thousands.
+
+Tables with three columns and at most THREE_COLUMN_ROWS rows (or the
+transpose) take the same shape one margin up: a node is the pair (a, b) left of the two smaller column sums (the
+third follows from the row total), the bounds are arrays over that grid,
+and the last three rows meet in the middle child by child: every (node,
+past value) pair of the third-last row is combined with each filling of
+that row and looked up in the sorted completions of the child it leads
+to, without building those pairs. The work grows with the number of
+undecided pairs, roughly N^4: a 5 x 3 table is exact in about a second
+up to N ~ 200-250 and falls back to Monte Carlo above that.
+
+Before the general network is built, its cost is estimated from the actual
+number of nodes per row (column-sum vectors with the row's remaining total)
+times the ways to fill that row. Tables above MAX_NETWORK steps, or that
+exceed MAX_WORK expansions, fall back to a Monte Carlo estimate: the
+permutation engine with the table probability as the statistic, chunked on
+a ResamplingPool. The reason is kept in ExactResult.reason.
+
+Usage:
+    res = fisher_exact_rxc(table)   # ExactResult(p_value, method, n_mc, mc_se, reason)
+"""
+
+from __future__ import annotations
+
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+from permutation import permutation_batches, permuted_tables, table_codes
+from resampling import ResamplingPool
+
+REL_TOL = 1e-7
+MAX_NETWORK = 20_000_000  # estimated steps (nodes x row fillings, see network_size) above which the network is not attempted
+MEET_ROWS = 3  # the last rows are resolved from memoized completions (meet in the middle)
+MAX_WORK = 20_000_000  # (past value x allocation) expansions before giving up
+N_MC = 20_000
+MC_SEED = 0
+CHUNK = 4_000_000  # array cells per step of the two-column bounds and the three-column expansion
+THREE_COLUMN_ROWS = 5  # more rows: the general network's memoized completions are cheaper than the child-by-child meet
+MAX_BOUNDS = 200_000_000  # (allocation x node) cells of the three-column bounds, vectorized per allocation
+
+
+class ExactResult(NamedTuple):
+    p_value: float
+    method: str  # "exact" or "monte_carlo"
+    n_mc: int  # Monte Carlo tables (0 for exact)
+    mc_se: float  # Monte Carlo standard error (0 for exact)
+    reason: str = ""  # why the exact network was not used (Monte Carlo only)
+
+
+class NetworkTooLarge(RuntimeError):
+    pass
+
+
+def log_factorials(n: int) -> np.ndarray:
+    return np.array([math.lgamma(k + 1) for k in range(n + 1)])
+
+
+def merge_paths(values: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Merge paths with the same statistic: sorted distinct values and summed counts."""
+    uniq, first, inv = np.unique(np.round(values, 9), return_index=True, return_inverse=True)
+    return values[first], np.bincount(inv.ravel(), weights=counts, minlength=len(uniq))
+
+
+class _Network:
+    def __init__(self, rows: np.ndarray, lf: np.ndarray):
+        self.rows = [int(v) for v in rows]
+        self.lf = lf
+        self._bounds = {}
+        self._alloc = {}
+        self._completions = {}
+
+    def allocations(self, total: int, s: tuple) -> tuple[list[tuple], np.ndarray, np.ndarray]:
+        """
+        All ways to fill one row of `total` under column sums s: the distinct
+        child nodes, and per way its sum(log n_ij!) and the index of its child.
+        """
+        key = (total, s)
+        if key not in self._alloc:
+            grids = np.meshgrid(*[np.arange(min(v, total) + 1) for v in s[:-1]], indexing="ij")
+            head = np.stack([g.ravel() for g in grids], axis=1)
+            last = total - head.sum(axis=1)
+            ok = (last >= 0) & (last <= s[-1])
+            cells = np.column_stack([head[ok], last[ok]])
+            children = -np.sort(cells - np.array(s), axis=1)  # remaining sums, sorted descending
+            uniq, inv = np.unique(children, axis=0, return_inverse=True)
+            self._alloc[key] = ([tuple(int(v) for v in u) for u in uniq], self.lf[cells].sum(axis=1), inv.ravel())
+        return self._alloc[key]
+
+    def bounds(self, k: int, s: tuple) -> tuple[float, float, float]:
+        """
+        Smallest and largest sum(log n_ij!) over all fillings of the rows k..
+        for column sums s (shortest and longest path to the end of the
+        network), and the log of sum(prod 1/n_ij!) over those fillings.
+        """
+        key = (k, s)
+        if key not in self._bounds:
+            lf, rest = self.lf, self.rows[k:]
+            log_total = lf[sum(s)] - lf[rest].sum() - lf[list(s)].sum()
+            if k == len(self.rows) - 1:
+                low = high = float(lf[list(s)].sum())  # the last row is forced
+            else:
+                children, stats, inv = self.allocations(self.rows[k], s)
+                below = np.array([self.bounds(k + 1, child)[:2] for child in children])
+                low = float((stats + below[inv, 0]).min())
+                high = float((stats + below[inv, 1]).max())
+            self._bounds[key] = (low, high, log_total)
+        return self._bounds[key]
+
+    def completions(self, k: int, s: tuple) -> tuple[np.ndarray, np.ndarray]:
+        """Distinct sum(log n_ij!) values of all fillings of rows k.. (sorted) with their counts."""
+        key = (k, s)
+        if key not in self._completions:
+            if k == len(self.rows) - 1:
+                self._completions[key] = (np.array([self.lf[list(s)].sum()]), np.ones(1))
+            else:
+                values, counts = [], []
+                for child, idx in self.groups(k, s):
+                    below, n_below = self.completions(k + 1, child)
+                    values.append((self.allocations(self.rows[k], s)[1][idx][:, None] + below[None, :]).ravel())
+                    counts.append(np.tile(n_below, len(idx)))
+                self._completions[key] = merge_paths(np.concatenate(values), np.concatenate(counts))
+        return self._completions[key]
+
+    def tail_probability(self, k: int, s: tuple, past: np.ndarray, thr: float, log_k: float) -> np.ndarray:
+        """
+        sum of count * exp(log_k - past - v) over the completions v of rows k..
+        with past + v >= thr, for every past value (a sorted-suffix lookup).
+        """
+        values, counts = self.completions(k, s)
+        v0 = values[0]
+        suffix = np.concatenate([np.cumsum((counts * np.exp(v0 - values))[::-1])[::-1], [0.0]])
+        return suffix[np.searchsorted(values, thr - past)] * np.exp(log_k - v0 - past)
+
+    def groups(self, k: int, s: tuple):
+        """Yield (child, indices of the allocations of row k that lead to it)."""
+        children, _, inv = self.allocations(self.rows[k], s)
+        order = np.argsort(inv, kind="stable")
+        splits = np.flatnonzero(np.diff(inv[order])) + 1
+        return zip(children, np.split(order, splits))
+
+    def expand(self, k: int, s: tuple, past: np.ndarray, counts: np.ndarray):
+        """Yield (child, past values, path counts) for every filling of row k."""
+        stats = self.allocations(self.rows[k], s)[1]
+        for child, idx in self.groups(k, s):
+            yield child, (past[:, None] + stats[idx][None, :]).ravel(), np.repeat(counts, len(idx))
+
+
+def network_size(rows: np.ndarray, cols: np.ndarray) -> float:
+    """
+    Estimated steps to build the network: for every row but the last, the
+    nodes it can reach (column-sum vectors s <= cols whose total is the
+    row's remaining total, counted as the coefficients of
+    prod_j (1 + x + ... + x^cols_j)) times the ways to fill the row (the
+    allocation grid over all columns but the last).
+    """
+    cols = np.asarray(cols, dtype=np.int64)
+    nodes = np.ones(1)
+    for c in cols:
+        nodes = np.convolve(nodes, np.ones(int(c) + 1))
+    remaining = np.cumsum(np.asarray(rows, dtype=np.int64)[::-1])[::-1]
+    fills = [np.prod(np.minimum(float(r), cols[:-1].astype(float)) + 1) for r in rows]
+    return float(sum(nodes[remaining[k]] * fills[k] for k in range(len(rows) - 1)))
+
+
+def _two_column_bounds(a: np.ndarray, low: np.ndarray, high: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """min_x a[x] + low[t - x] and max_x a[x] + high[t - x] for every t (x <= t), in chunks of t."""
+    x = np.arange(len(a))
+    out_low, out_high = np.full(len(low), np.inf), np.full(len(low), -np.inf)
+    step = max(1, CHUNK // len(a))
+    for start in range(0, len(low), step):
+        t = np.arange(start, min(start + step, len(low)))
+        child = t[:, None] - x[None, :]
+        ok = child >= 0
+        child = np.where(ok, child, 0)
+        out_low[t] = np.where(ok, a + low[child], np.inf).min(axis=1)
+        out_high[t] = np.where(ok, a + high[child], -np.inf).max(axis=1)
+    return out_low, out_high
+
+
+def _merge_nodes(nodes: np.ndarray, past: np.ndarray, counts: np.ndarray):
+    """merge_paths per node: (node, past value) pairs made distinct, counts summed."""
+    key = np.round(past, 9)
+    order = np.lexsort((key, nodes))
+    nodes, past, key, counts = nodes[order], past[order], key[order], counts[order]
+    first = np.flatnonzero(np.r_[True, (nodes[1:] != nodes[:-1]) | (key[1:] != key[:-1])])
+    return nodes[first], past[first], np.add.reduceat(counts, first)
+
+
+def two_column_pvalue(table, max_work: int = MAX_WORK) -> float:
+    """
+    Exact p-value of an r x 2 table by the one-margin recursion; the node of
+    a row is t, the part of the smaller column sum left for the rows from
+    there on. Raises NetworkTooLarge after max_work expansions.
+    """
+    table = np.asarray(table, dtype=np.int64)
+    rows = np.sort(table.sum(axis=1))  # the largest rows last, where they meet in the middle
+    c1, c2 = sorted(int(v) for v in table.sum(axis=0))
+    n = int(rows.sum())
+    lf = log_factorials(n)
+    thr = lf[table].sum() - REL_TOL
+    log_k = lf[rows].sum() + lf[c1] + lf[c2] - lf[n]
+
+    # bounds of the completions of rows k.. per node t (inf/-inf where t cannot occur), last row first
+    m, t = len(rows), np.arange(c1 + 1)
+    remaining = np.cumsum(rows[::-1])[::-1]
+    low, high, log_total = [None] * m, [None] * m, [None] * m
+    for k in reversed(range(m)):
+        r, total = int(rows[k]), int(remaining[k])
+        valid = (total - t >= 0) & (total - t <= c2)
+        if k == m - 1:
+            low[k] = high[k] = lf[np.minimum(t, r)] + lf[np.clip(r - t, 0, r)]  # the last row is forced
+        else:
+            x = np.arange(r + 1)
+            low[k], high[k] = _two_column_bounds(lf[x] + lf[r - x], low[k + 1], high[k + 1])
+        low[k], high[k] = np.where(valid, low[k], np.inf), np.where(valid, high[k], -np.inf)
+        log_total[k] = lf[total] - lf[rows[k:]].sum() - lf[t] - lf[np.clip(total - t, 0, total)]
+
+    p, work = 0.0, 0
+    nodes, past, counts = np.array([c1]), np.zeros(1), np.ones(1)
+    for k in range(m):
+        done = past + low[k][nodes] >= thr
+        p += float((counts[done] * np.exp(log_total[k][nodes[done]] + log_k - past[done])).sum())
+        keep = ~done & (past + high[k][nodes] >= thr)
+        if k == m - 1 or not keep.any():
+            break
+        nodes, past, counts = nodes[keep], past[keep], counts[keep]
+        r, nxt = int(rows[k]), int(remaining[k + 1])
+        if k == m - 2:
+            # meet in the middle: the completions of the last two rows of each node, sorted, one lookup per past value
+            last = int(rows[k + 1])
+            starts = np.flatnonzero(np.r_[True, nodes[1:] != nodes[:-1]])  # nodes are sorted (see _merge_nodes)
+            for lo, hi in zip(starts, np.r_[starts[1:], len(nodes)]):
+                node = int(nodes[lo])
+                x = np.arange(max(0, node - last), min(r, node) + 1)
+                values = np.sort(lf[x] + lf[r - x] + lf[node - x] + lf[last - node + x])
+                work += len(values) + hi - lo
+                if work > max_work:
+                    raise NetworkTooLarge(f"more than {max_work:.0e} expansions")
+                suffix = np.concatenate([np.cumsum(np.exp(values[0] - values)[::-1])[::-1], [0.0]])
+                tail = suffix[np.searchsorted(values, thr - past[lo:hi])]
+                p += float((counts[lo:hi] * tail * np.exp(log_k - values[0] - past[lo:hi])).sum())
+            break
+        # row k takes x of the t; the child t - x must be a node of row k + 1
+        x_low = np.maximum(0, nodes - min(c1, nxt))
+        x_high = np.minimum(r, nodes - max(0, nxt - c2))
+        sizes = np.maximum(x_high - x_low + 1, 0)
+        work += int(sizes.sum())
+        if work > max_work:
+            raise NetworkTooLarge(f"more than {max_work:.0e} expansions")
+        parent = np.repeat(np.arange(len(nodes)), sizes)
+        x = x_low[parent] + np.arange(len(parent)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        nodes, past, counts = _merge_nodes(nodes[parent] - x, past[parent] + lf[x] + lf[r - x], counts[parent])
+    return min(p, 1.0)
+
+
+def _row_allocations(r: int, cols: tuple[int, int, int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All (x, y, z) with x + y + z = r within the column sums cols."""
+    x, y = np.meshgrid(np.arange(min(r, cols[0]) + 1), np.arange(min(r, cols[1]) + 1), indexing="ij")
+    x, y = x.ravel(), y.ravel()
+    z = r - x - y
+    ok = (z >= 0) & (z <= cols[2])
+    return x[ok], y[ok], z[ok]
+
+
+def _three_column_bounds(r: int, lf: np.ndarray, cols: tuple, low: np.ndarray, high: np.ndarray):
+    """min and max over the fillings (x, y, z) of a row of lf[x] + lf[y] + lf[z] + low/high[a - x, b - y]."""
+    x, y, z = _row_allocations(r, cols)
+    stats = lf[x] + lf[y] + lf[z]
+    out_low, out_high = np.full(low.shape, np.inf), np.full(low.shape, -np.inf)
+    n_a, n_b = low.shape
+    for xi, yi, stat in zip(x.tolist(), y.tolist(), stats.tolist()):
+        child = (slice(0, n_a - xi), slice(0, n_b - yi))
+        np.minimum(out_low[xi:, yi:], low[child] + stat, out=out_low[xi:, yi:])
+        np.maximum(out_high[xi:, yi:], high[child] + stat, out=out_high[xi:, yi:])
+    return out_low, out_high
+
+
+def _three_column_meet(nodes, past, counts, rows, cols, width, lf, thr, log_k, max_work):
+    """
+    Tail probability of the last three rows (rows = their sums) for (node,
+    past value) pairs sorted by node: child by child, the pairs that can
+    reach it (a node (a, b) reaches (a', b') by x = a - a', y = b - b') are
+    looked up in the sorted completions of its last two rows. Raises
+    NetworkTooLarge after max_work expansions.
+    """
+    r, r2, r3 = rows
+    c1, c2, c3 = cols
+    na, nb = np.divmod(nodes, width)
+    x2, y2, z2 = _row_allocations(r2, cols)
+    stats2 = lf[x2] + lf[y2] + lf[z2]
+    p, work = 0.0, 0
+    for a in range(max(0, int(na[0]) - r), int(na[-1]) + 1):
+        # the parents of column a' = a: nodes a .. a + r, ordered by b
+        lo, hi = np.searchsorted(nodes, [a * width, (a + r + 1) * width])
+        if lo == hi:
+            continue
+        order = lo + np.argsort(nb[lo:hi], kind="stable")
+        pa, pb, pp, pc = na[order], nb[order], past[order], counts[order]
+        for b in range(max(0, int(pb[0]) - r), min(int(pb[-1]), c2) + 1):
+            c = r2 + r3 - a - b
+            if not 0 <= c <= c3:
+                continue
+            lo, hi = np.searchsorted(pb, [b, b + r + 1])
+            ok = np.flatnonzero(pa[lo:hi] + pb[lo:hi] <= r + a + b) + lo  # z = r - x - y >= 0
+            if not len(ok):
+                continue
+            x, y = pa[ok] - a, pb[ok] - b
+            base = pp[ok] + lf[x] + lf[y] + lf[r - x - y]
+            fit = (x2 <= a) & (y2 <= b) & (z2 <= c)
+            values = np.sort(stats2[fit] + lf[a - x2[fit]] + lf[b - y2[fit]] + lf[c - z2[fit]])
+            work += len(values) + len(ok)
+            if work > max_work:
+                raise NetworkTooLarge(f"more than {max_work:.0e} expansions")
+            suffix = np.concatenate([np.cumsum(np.exp(values[0] - values)[::-1])[::-1], [0.0]])
+            tail = suffix[np.searchsorted(values, thr - base)]
+            p += float((pc[ok] * tail * np.exp(log_k - values[0] - base)).sum())
+    return p
+
+
+def three_column_pvalue(table, max_work: int = MAX_WORK) -> float:
+    """
+    Exact p-value of an r x 3 table (r >= 3); the node of a row is (a, b),
+    the parts of the two smaller column sums left for the rows from there
+    on, flattened to a * (c2 + 1) + b. Raises NetworkTooLarge if the bounds
+    exceed MAX_BOUNDS cells or after max_work expansions.
+    """
+    table = np.asarray(table, dtype=np.int64)
+    rows = np.sort(table.sum(axis=1))  # the largest rows last, where they meet in the middle
+    cols = tuple(sorted(int(v) for v in table.sum(axis=0)))
+    c1, c2, c3 = cols
+    n = int(rows.sum())
+    m, width = len(rows), c2 + 1
+    cells = (c1 + 1) * width * sum(len(_row_allocations(int(r), cols)[0]) for r in rows[:-1])
+    if cells > MAX_BOUNDS:
+        raise NetworkTooLarge(f"three-column bounds ~{cells:.1e} cells > {MAX_BOUNDS:.0e}")
+    lf = log_factorials(n)
+    thr = lf[table].sum() - REL_TOL
+    log_k = lf[rows].sum() + lf[list(cols)].sum() - lf[n]
+
+    # bounds of the completions of rows k.. per node (a, b) (inf/-inf where it cannot occur), last row first
+    a, b = np.arange(c1 + 1)[:, None], np.arange(c2 + 1)[None, :]
+    remaining = np.cumsum(rows[::-1])[::-1]
+    low, high, log_total = [None] * m, [None] * m, [None] * m
+    for k in reversed(range(m)):
+        r, total = int(rows[k]), int(remaining[k])
+        c = total - a - b
+        valid = (c >= 0) & (c <= c3)
+        c = np.clip(c, 0, c3)
+        if k == m - 1:
+            low[k] = high[k] = np.broadcast_to(lf[a] + lf[b] + lf[c], valid.shape)  # the last row is forced
+        else:
+            low[k], high[k] = _three_column_bounds(r, lf, cols, low[k + 1], high[k + 1])
+        low[k], high[k] = np.where(valid, low[k], np.inf), np.where(valid, high[k], -np.inf)
+        log_total[k] = lf[total] - lf[rows[k:]].sum() - lf[a] - lf[b] - lf[c]
+    low, high, log_total = [v.ravel() for v in low], [v.ravel() for v in high], [v.ravel() for v in log_total]
+
+    p, work = 0.0, 0
+    nodes, past, counts = np.array([c1 * width + c2]), np.zeros(1), np.ones(1)
+    for k in range(m - 2):
+        done = past + low[k][nodes] >= thr
+        p += float((counts[done] * np.exp(log_total[k][nodes[done]] + log_k - past[done])).sum())
+        keep = ~done & (past + high[k][nodes] >= thr)
+        if not keep.any():
+            break
+        nodes, past, counts = nodes[keep], past[keep], counts[keep]
+        if k == m - 3:
+            p += _three_column_meet(nodes, past, counts, [int(v) for v in rows[k:]], cols, width,
+                                    lf, thr, log_k, max_work - work)
+            break
+        # every filling (x, y, z) of row k whose child (a - x, b - y) is a node of row k + 1, in chunks of nodes
+        x, y, z = _row_allocations(int(rows[k]), cols)
+        na, nb = np.divmod(nodes, width)
+        nc = int(remaining[k]) - na - nb
+        parent, fill = [], []
+        step = max(1, CHUNK // len(x))
+        for start in range(0, len(nodes), step):
+            part = slice(start, start + step)
+            fits = (na[part, None] >= x) & (nb[part, None] >= y) & (nc[part, None] >= z)
+            work += int(fits.sum())
+            if work > max_work:
+                raise NetworkTooLarge(f"more than {max_work:.0e} expansions")
+            i, j = np.nonzero(fits)
+            parent.append(i + start)
+            fill.append(j)
+        parent, fill = np.concatenate(parent), np.concatenate(fill)
+        nodes, past, counts = _merge_nodes(nodes[parent] - x[fill] * width - y[fill],
+                                           past[parent] + lf[x[fill]] + lf[y[fill]] + lf[z[fill]], counts[parent])
+    return min(p, 1.0)
+
+
+def network_pvalue(table, max_work: int = MAX_WORK) -> float:
+    """Exact p-value; raises NetworkTooLarge if the network is estimated too large or exceeds max_work."""
+    table = np.asarray(table, dtype=np.int64)
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    if table.shape[1] > table.shape[0]:
+        table = table.T  # nodes are column-sum vectors: keep them short
+    if min(table.shape) <= 1:
+        return 1.0
+    if table.shape[1] == 2:
+        return two_column_pvalue(table, max_work)
+    if table.shape[1] == 3 and table.shape[0] <= THREE_COLUMN_ROWS:
+        return three_column_pvalue(table, max_work)
+    rows = np.sort(table.sum(axis=1))[::-1]
+    cols = np.sort(table.sum(axis=0))[::-1]
+    n = int(table.sum())
+    size = network_size(rows, cols)
+    if size > MAX_NETWORK:
+        raise NetworkTooLarge(f"network ~{size:.1e} steps > {MAX_NETWORK:.0e}")
+
+    lf = log_factorials(n)
+    net = _Network(rows, lf)
+    thr = lf[table].sum() - REL_TOL  # a table counts if its sum(log n_ij!) >= thr
+    log_k = lf[rows].sum() + lf[cols].sum() - lf[n]
+
+    p, work = 0.0, 0
+    meet = max(len(rows) - MEET_ROWS, 0)
+    nodes = {tuple(int(v) for v in cols): (np.zeros(1), np.ones(1))}
+    for k in range(meet + 1):
+        children = {}
+        for s, (past, counts) in nodes.items():
+            low, high, log_total = net.bounds(k, s)
+            done = past + low >= thr
+            p += float((counts[done] * np.exp(log_total + log_k - past[done])).sum())
+            keep = ~done & (past + high >= thr)
+            if not keep.any():
+                continue
+            past, counts = past[keep], counts[keep]
+            if k == meet:
+                work += len(past) + len(net.completions(k, s)[0])
+                if work > max_work:
+                    raise NetworkTooLarge(f"more than {max_work:.0e} expansions")
+                p += float((counts * net.tail_probability(k, s, past, thr, log_k)).sum())
+                continue
+            for child, child_past, child_counts in net.expand(k, s, past, counts):
+                work += len(child_past)
+                if work > max_work:
+                    raise NetworkTooLarge(f"more than {max_work:.0e} expansions")
+                children.setdefault(child, []).append((child_past, child_counts))
+        nodes = {child: merge_paths(np.concatenate([a for a, _ in parts]), np.concatenate([b for _, b in parts]))
+                 for child, parts in children.items()}
+    return min(p, 1.0)
+
+
+def _mc_chunk(x, y, r, c, thr, lf, seed_seq, n):
+    rng = np.random.default_rng(seed_seq)
+    count = 0
+    for perms in permutation_batches(rng, len(x), n):
+        tables = permuted_tables(x, y, r, c, perms)
+        count += int((lf[tables].reshape(len(perms), -1).sum(axis=1) >= thr).sum())
+    return count
+
+
+def monte_carlo_pvalue(table, n_mc: int = N_MC, seed: int = MC_SEED,
+                       pool: ResamplingPool | None = None, reason: str = "") -> ExactResult:
+    """(count + 1) / (n_mc + 1) over random tables with the observed margins."""
+    table = np.asarray(table, dtype=np.int64)
+    r, c = table.shape
+    x, y = table_codes(table)
+    lf = log_factorials(int(table.sum()))
+    thr = lf[table].sum() - REL_TOL
+    args = (x, y, r, c, thr, lf)
+
+    def merge(counts):
+        p = (sum(counts) + 1) / (n_mc + 1)
+        return ExactResult(p, "monte_carlo", n_mc, math.sqrt(p * (1 - p) / n_mc), reason)
+
+    if pool is None:
+        with ResamplingPool(1) as local:
+            return local.map_chunks(_mc_chunk, args, n_mc, seed, merge).result()
+    return pool.map_chunks(_mc_chunk, args, n_mc, seed, merge).result()
+
+
+def fisher_exact_rxc(table, n_mc: int = N_MC, seed: int = MC_SEED,
+                     pool: ResamplingPool | None = None) -> ExactResult:
+    """Exact Fisher-Freeman-Halton p-value; Monte Carlo when the network is too large."""
+    try:
+        return ExactResult(network_pvalue(table), "exact", 0, 0.0)
+    except NetworkTooLarge as exc:
+        return monte_carlo_pvalue(table, n_mc, seed, pool, reason=str(exc))
@@ -0,0 +1,180 @@
+"""
+ingest.py
+Shared ingest for the coded issue CSVs (used by 01–04).
+
+Reads ./Cuda-Q/cudaq_issues_raw.csv and ./qskit/github_issues.csv once:
+normalizes column names, drops embedded header rows, deduplicates by
+(project, issueid) keeping the last row, applies the Qiskit gpu_relevant
+filter and cleans the label columns, which are then cast to the categorical
+schema of schema.py (fixed category orders, integer codes). The cleaned table is cached as Parquet
+in ./.ingest_cache/, keyed by the SHA-256 of both source files (and
+INGEST_VERSION), so every later stage and re-run skips the CSV parsing.
+Without pyarrow the table is rebuilt on every call.
+
+Columns:
+    source, project, issueid, uid, status_norm, createdat_parsed,
+    gpu_relevant_bool, stacklayer, bugtype, ctclass, ctsubtype_norm
+
+Usage:
+    from ingest import load_coded
+    df = load_coded()      # all included issues (CUDA-Q + Qiskit GPU-relevant)
+    python ingest.py       # build/refresh the cache and print N
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from schema import apply_schema
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+CUDAQ_FILE = Path("./Cuda-Q/cudaq_issues_raw.csv")
+QISKIT_FILE = Path("./qskit/github_issues.csv")
+CACHE_DIR = Path("./.ingest_cache")
+
+# bump when the cleaning below changes, so old caches are not reused
+INGEST_VERSION = 2
+
+REQUIRED = ["project", "issueid", "stacklayer", "bugtype", "ctclass"]
+CTSUBTYPE_CANDIDATES = ["ctsubtype", "ct_subtype", "subclass", "subtype", "b1/b2"]
+
+# gpu_relevant is marked with "X"; accept the other common encodings too
+GPU_TRUE = {"true", "1", "yes", "y", "x", "gpu", "g"}
+
+COLUMNS = [
+    "source", "project", "issueid", "uid", "status_norm", "createdat_parsed",
+    "gpu_relevant_bool", "stacklayer", "bugtype", "ctclass", "ctsubtype_norm",
+]
+
+
+def norm_col(c: str) -> str:
+    c = str(c).replace("\ufeff", "").strip().lower()
+    c = c.replace(" ", "_")
+    return c
+
+
+def read_coded_csv(path: Path, source: str, gpu_filter: bool) -> pd.DataFrame:
+    df = pd.read_csv(path, encoding="utf-8-sig", dtype=str)
+    df.columns = [norm_col(c) for c in df.columns]
+
+    # embedded header rows (targeted)
+    if "issueid" in df.columns:
+        df = df[df["issueid"].astype(str).str.strip().str.lower() != "issueid"]
+    if "project" in df.columns:
+        df = df[df["project"].astype(str).str.strip().str.lower() != "project"]
+
+    required = REQUIRED + (["gpu_relevant"] if gpu_filter else [])
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        print(f"FEHLER in {path}: Missing required columns: {missing}")
+        print(f"Available: {list(df.columns)}")
+        sys.exit(1)
+
+    out = pd.DataFrame(index=df.index)
+    out["source"] = source
+    out["project"] = df["project"].str.strip()
+    out["issueid"] = df["issueid"].str.strip()
+    out["status_norm"] = df.get("status", pd.Series("", index=df.index)).fillna("").str.strip().str.lower()
+    out["createdat_parsed"] = pd.to_datetime(df.get("createdat"), errors="coerce", utc=True)
+    if gpu_filter:
+        out["gpu_relevant_bool"] = df["gpu_relevant"].fillna("").str.strip().str.lower().isin(GPU_TRUE)
+    else:
+        out["gpu_relevant_bool"] = True
+    out["stacklayer"] = df["stacklayer"].str.strip()
+    out["bugtype"] = df["bugtype"].str.strip()
+    out["ctclass"] = df["ctclass"].str.strip().str.upper()
+    for col in ["stacklayer", "bugtype", "ctclass"]:
+        out[col] = out[col].replace("", pd.NA)  # empty label = not coded
+
+    # B1/B2/Missing normalization (subtype column has several names in the exports)
+    ctsubtype_col = next((c for c in map(norm_col, CTSUBTYPE_CANDIDATES) if c in df.columns), None)
+    if ctsubtype_col:
+        sub = df[ctsubtype_col].fillna("").str.strip().str.upper()
+        out["ctsubtype_norm"] = "Missing"
+        out.loc[sub.str.startswith("B1"), "ctsubtype_norm"] = "B1"
+        out.loc[sub.str.startswith("B2"), "ctsubtype_norm"] = "B2"
+    else:
+        print(f"WARNUNG in {path}: Keine CTSubType-Spalte gefunden, alle Subtypes = 'Missing'.")
+        out["ctsubtype_norm"] = "Missing"
+
+    # the last coding of an issue wins, also for the GPU filter
+    out = out.drop_duplicates(subset=["project", "issueid"], keep="last")
+
+    if gpu_filter:
+        kept = out[out["gpu_relevant_bool"]]
+        if kept.empty:
+            print(f"WARNING: After filtering gpu_relevant, {path} is empty.")
+            print("Unique raw gpu_relevant values (top 20):")
+            print(df["gpu_relevant"].fillna("").str.strip().value_counts().head(20))
+        out = kept
+
+    out["uid"] = out["project"] + "#" + out["issueid"]
+    return out[COLUMNS]
+
+
+def source_hash(paths=(CUDAQ_FILE, QISKIT_FILE)) -> str:
+    h = hashlib.sha256(f"ingest-v{INGEST_VERSION}".encode())
+    for path in paths:
+        h.update(Path(path).read_bytes())
+    return h.hexdigest()
+
+
+def build_coded(cudaq_file: Path = CUDAQ_FILE, qiskit_file: Path = QISKIT_FILE) -> pd.DataFrame:
+    cudaq = read_coded_csv(cudaq_file, "cudaq", gpu_filter=False)
+    qiskit = read_coded_csv(qiskit_file, "qiskit", gpu_filter=True)
+    return apply_schema(pd.concat([cudaq, qiskit], ignore_index=True))
+
+
+def load_coded(cudaq_file: Path = CUDAQ_FILE, qiskit_file: Path = QISKIT_FILE,
+               cache_dir: Path = CACHE_DIR) -> pd.DataFrame:
+    """Cleaned, combined issue table; read from the Parquet cache when the sources are unchanged."""
+    if not HAS_PYARROW:
+        return build_coded(cudaq_file, qiskit_file)
+
+    cache_dir = Path(cache_dir)
+    cache_file = cache_dir / f"coded_{source_hash((cudaq_file, qiskit_file))[:16]}.parquet"
+    try:
+        return pd.read_parquet(cache_file)
+    except FileNotFoundError:
+        pass
+
+    df = build_coded(cudaq_file, qiskit_file)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # a temp file of our own, so concurrent builds (parallel stages) never write into the same file
+    with tempfile.NamedTemporaryFile(dir=cache_dir, prefix="coded_", suffix=".tmp", delete=False) as tmp:
+        pass
+    try:
+        df.to_parquet(tmp.name, index=False)
+        os.replace(tmp.name, cache_file)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    # caches of older sources; another run may just have removed (or still be reading) them
+    for old in cache_dir.glob("coded_*.parquet"):
+        if old != cache_file:
+            old.unlink(missing_ok=True)
+    return df
+
+
+def main() -> None:
+    df = load_coded()
+    n = df.groupby("source")["uid"].nunique()
+    print(f"N (uid unique): CUDA-Q={n.get('cudaq', 0)}, Qiskit(GPU)={n.get('qiskit', 0)}, Total={df['uid'].nunique()}")
+    if not HAS_PYARROW:
+        print("NOTE: pyarrow not available -> no ingest cache written.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+intervals.py
+Vectorized confidence intervals for proportions (no statsmodels needed).
+
+proportion_ci(count, total) takes scalars or whole arrays and returns both
+bounds in one pass:
+- "wilson"          closed-form Wilson score interval (default)
+- "agresti_coull"   Agresti-Coull (adjusted Wald), clipped to [0, 1]
+- "clopper_pearson" exact interval from beta quantiles (needs SciPy)
+
+Rows with total == 0 get NaN bounds. Results match
+statsmodels.stats.proportion.proportion_confint for the same method.
+"""
+
+from __future__ import annotations
+
+from statistics import NormalDist
+
+import numpy as np
+
+# --- optional SciPy (only for Clopper-Pearson) ---
+HAS_SCIPY = True
+try:
+    from scipy.stats import beta as beta_dist
+except Exception:
+    HAS_SCIPY = False
+
+METHODS = ("wilson", "agresti_coull", "clopper_pearson")
+
+
+def proportion_ci(count, total, alpha: float = 0.05, method: str = "wilson"):
+    """Return (low, high) as float arrays (proportions in [0, 1])."""
+    x = np.asarray(count, dtype=float)
+    n = np.asarray(total, dtype=float)
+    x, n = np.broadcast_arrays(x, n)
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "wilson":
+            p = x / n
+            denom = 1 + z**2 / n
+            center = (p + z**2 / (2 * n)) / denom
+            half = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denom
+            low, high = center - half, center + half
+        elif method == "agresti_coull":
+            n_t = n + z**2
+            p_t = (x + z**2 / 2) / n_t
+            half = z * np.sqrt(p_t * (1 - p_t) / n_t)
+            low, high = np.clip(p_t - half, 0, 1), np.clip(p_t + half, 0, 1)
+        elif method == "clopper_pearson":
+            if not HAS_SCIPY:
+                raise RuntimeError("clopper_pearson needs SciPy")
+            low = np.where(x > 0, beta_dist.ppf(alpha / 2, x, n - x + 1), 0.0)
+            high = np.where(x < n, beta_dist.ppf(1 - alpha / 2, x + 1, n - x), 1.0)
+        else:
+            raise ValueError(f"unknown method {method!r} (known: {', '.join(METHODS)})")
+
+    empty = n <= 0
+    low = np.where(empty, np.nan, low)
+    high = np.where(empty, np.nan, high)
+    return low, high
+
+
+def pct_ci_columns(count, total, alpha: float = 0.05, method: str = "wilson", decimals: int = 1) -> dict:
+    """{'pct_ci_low': ..., 'pct_ci_high': ...} in percent, rounded like the percent column."""
+    low, high = proportion_ci(count, total, alpha, method)
+    return {"pct_ci_low": np.round(low * 100, decimals), "pct_ci_high": np.round(high * 100, decimals)}
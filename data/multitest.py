@@ -0,0 +1,43 @@
+"""
+multitest.py
+Multiple-testing adjustments, vectorized along the last axis.
+
+holm() and benjamini_hochberg() take one family of p-values as a 1-D array,
+or many families at once as the rows of a 2-D array (e.g. the cells of a
+stack of tables). NaN entries are not tests: they are left out of the
+family size m and stay NaN. The Benjamini-Hochberg values match
+scipy.stats.false_discovery_control.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def _sorted_family(p):
+    p = np.asarray(p, dtype=float)
+    order = np.argsort(p, axis=-1, kind="stable")  # NaN last
+    ps = np.take_along_axis(p, order, axis=-1)
+    m = np.isfinite(p).sum(axis=-1, keepdims=True)
+    rank = np.arange(1, p.shape[-1] + 1)
+    return p, order, ps, m, rank
+
+
+def _unsort(p, order, adj) -> np.ndarray:
+    out = np.empty_like(p)
+    np.put_along_axis(out, order, np.minimum(adj, 1.0), axis=-1)
+    return np.where(np.isfinite(p), out, np.nan)
+
+
+def holm(p) -> np.ndarray:
+    """Holm step-down adjusted p-values."""
+    p, order, ps, m, rank = _sorted_family(p)
+    adj = np.fmax.accumulate((m - rank + 1) * ps, axis=-1)
+    return _unsort(p, order, adj)
+
+
+def benjamini_hochberg(p) -> np.ndarray:
+    """Benjamini-Hochberg (false discovery rate) adjusted p-values."""
+    p, order, ps, m, rank = _sorted_family(p)
+    adj = np.flip(np.fmin.accumulate(np.flip(ps * m / rank, axis=-1), axis=-1), axis=-1)
+    return _unsort(p, order, adj)
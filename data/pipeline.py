@@ -0,0 +1,178 @@
+"""
+pipeline.py
+End-to-end run in one process: ingest -> overview (01) -> distributions (02)
+-> cross-tabs (03) -> effect sizes (04) -> figures.
+
+The stages hand their results to each other in memory: the ingest table,
+one ContingencyCube shared by 02 and 03, and the typed c_*/d_* tables
+(tables.py), which the figure modules take from a store instead of reading
+CSVs back. Writing the tables is optional (--write-tables DIR); by default
+only the figures are written. Inputs and outputs are resolved against this
+file's directory (or given on the command line), not the working directory.
+
+The stages form a dependency graph (scheduler.py): every stage declares
+the artifacts it reads and writes, each figure its INPUTS tables. With
+--jobs N independent stages run concurrently on N worker processes, e.g.
+the figures next to the exact tests of 04, so the wall time is that of the
+critical path (ingest -> effect sizes). A failed stage stops only the
+stages that depend on it.
+
+The stage scripts (01_amount_of_issues.py, 02_basic.py, ...) still run on
+their own with their build cache; the pipeline computes everything in one
+pass and does not use the build cache.
+
+Usage:
+    python pipeline.py                               # figures -> processed/figures
+    python pipeline.py --jobs 4                      # independent stages in parallel
+    python pipeline.py --write-tables out            # ... plus all tables (CSV + schema)
+    python pipeline.py --skip effect_sizes           # without the (slow) exact tests
+    python pipeline.py --data-dir /path/to/data --figures-dir /tmp/figs --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from cube import LABEL_DIMS, ContingencyCube
+from ingest import CACHE_DIR, CUDAQ_FILE, QISKIT_FILE, load_coded
+from scheduler import DONE, Stage, run_stages
+from tables import write_table
+
+HERE = Path(__file__).resolve().parent
+if str(HERE / "processed") not in sys.path:
+    sys.path.insert(0, str(HERE / "processed"))
+
+# the stage scripts start with a digit, so they are imported by name
+overview = importlib.import_module("01_amount_of_issues")
+basic = importlib.import_module("02_basic")
+cross = importlib.import_module("03_cross")
+effects = importlib.import_module("04")
+
+STAGES = ["overview", "distributions", "crosstabs", "effect_sizes", "figures"]
+FIGURES_DIR = HERE / "processed" / "figures"
+EFFECT_TABLES = ("e_effect_sizes", "e_association_pairs", "e_association_matrix")
+
+
+def distribution_names() -> tuple[str, ...]:
+    return tuple(f"{prefix}_{kind}" for _, prefix, _ in basic.DISTRIBUTIONS for kind in ("overall", "by_project"))
+
+
+def crosstab_names() -> tuple[str, ...]:
+    return tuple(f"{prefix}_{'by_project' if by_project else 'overall'}_{part}"
+                 for _, _, prefix, kinds in cross.CROSSTABS for by_project in kinds
+                 for part in ("counts", "pct", "ci", "posthoc")) + ("d_audit_unique_labels",)
+
+
+# stage functions: inputs (artifact -> value) -> outputs; top-level so they can run on a process pool
+def ingest_stage(data_dir: Path, inputs: dict) -> dict:
+    df = load_coded(data_dir / CUDAQ_FILE, data_dir / QISKIT_FILE, data_dir / CACHE_DIR)
+    # one counting pass for all c_*/d_* tables
+    return {"coded": df, "cube": ContingencyCube.from_frame(df, LABEL_DIMS)}
+
+
+def overview_stage(inputs: dict) -> dict:
+    return {"table1_dataset_overview": overview.dataset_overview(inputs["coded"])}
+
+
+def distributions_stage(inputs: dict) -> dict:
+    return basic.distribution_tables(inputs["cube"])
+
+
+def crosstabs_stage(inputs: dict) -> dict:
+    return cross.cross_tables(inputs["cube"])
+
+
+def effect_sizes_stage(workers: int, inputs: dict) -> dict:
+    return effects.effect_sizes(inputs["coded"], workers=workers)
+
+
+def figure_stage(name: str, figures_dir: str, inputs: dict) -> dict:
+    from render_figures import render_one
+    return {name: render_one(name, figures_dir, store=inputs)}
+
+
+def pipeline_stages(data_dir: Path = HERE, figures_dir: Path = FIGURES_DIR, skip=(),
+                    workers: int = effects.N_WORKERS) -> list[Stage]:
+    """The stage graph; each figure depends only on the tables in its module's INPUTS."""
+    stages = [
+        Stage("ingest", partial(ingest_stage, Path(data_dir)), (), ("coded", "cube")),
+        Stage("overview", overview_stage, ("coded",), ("table1_dataset_overview",)),
+        Stage("distributions", distributions_stage, ("cube",), distribution_names()),
+        Stage("crosstabs", crosstabs_stage, ("cube",), crosstab_names()),
+        Stage("effect_sizes", partial(effect_sizes_stage, workers), ("coded",), EFFECT_TABLES),
+    ]
+    if "figures" not in skip:
+        from render_figures import FIGURES
+        for name, module in FIGURES.items():
+            inputs = tuple(importlib.import_module(module).INPUTS)
+            stages.append(Stage(name, partial(figure_stage, name, str(figures_dir)), inputs, (name,)))
+    return [s for s in stages if s.name not in skip]
+
+
+def write_tables(tables: dict[str, pd.DataFrame], out_dir: Path) -> list[str]:
+    """Typed tables as CSV + schema (+ Parquet, see tables.py), the others as plain CSV."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        if "table_schema" in table.attrs:
+            paths += write_table(table, out_dir / name)
+        else:
+            table.to_csv(out_dir / f"{name}.csv", index=False)
+            paths.append(str(out_dir / f"{name}.csv"))
+    return paths
+
+
+def run(data_dir: Path = HERE, tables_dir: Path | None = None, figures_dir: Path = FIGURES_DIR,
+        skip=(), workers: int = effects.N_WORKERS, jobs: int = 1):
+    """
+    Run all stages not in skip, independent ones on `jobs` processes; returns
+    (tables, figure paths, results), with tables: name -> DataFrame (the
+    c_*/d_* tables typed, see tables.py) and results: stage -> StageResult.
+    """
+    from render_figures import FIGURES
+    artifacts, results = run_stages(pipeline_stages(data_dir, figures_dir, skip, workers), workers=jobs)
+    tables = {name: value for name, value in artifacts.items()
+              if isinstance(value, pd.DataFrame) and name != "coded"}
+    figures = [path for name in FIGURES for path in artifacts.get(name, [])]
+
+    if tables_dir is not None:
+        paths = write_tables(tables, tables_dir)
+        print(f"Wrote {len(paths)} files to {tables_dir}")
+    return tables, figures, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=HERE, help="directory with Cuda-Q/ and qskit/")
+    parser.add_argument("--write-tables", type=Path, metavar="DIR", help="also write all tables to DIR")
+    parser.add_argument("--figures-dir", type=Path, default=FIGURES_DIR)
+    parser.add_argument("--skip", nargs="+", choices=STAGES, default=[], help="stages to leave out")
+    parser.add_argument("--jobs", type=int, default=1, help="run independent stages on this many processes")
+    parser.add_argument("--workers", type=int, default=effects.N_WORKERS,
+                        help="worker processes for the resampling in effect_sizes")
+    args = parser.parse_args()
+    if "figures" not in args.skip and {"distributions", "crosstabs"} & set(args.skip):
+        parser.error("figures need the distributions and crosstabs stages (or --skip figures)")
+
+    start = time.perf_counter()
+    _, _, results = run(args.data_dir, args.write_tables, args.figures_dir, args.skip, args.workers, args.jobs)
+    print("\nStages:")
+    for res in results.values():
+        detail = f"{res.seconds:6.2f}s" if res.status == DONE else f"{res.status}: {res.error}"
+        print(f"  {res.name:<24} {detail}")
+    failed = [res.name for res in results.values() if res.status != DONE]
+    if failed:
+        sys.exit(f"✗ Pipeline incomplete after {time.perf_counter() - start:.1f}s ({', '.join(failed)} not done)")
+    print(f"✓ Pipeline done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+posthoc.py
+Cell-level post-hoc statistics for cross-tabs: which cells drive an association.
+
+For a stack of (B, r, c) tables, all at once:
+- expected counts E = R_i C_j / N
+- chi-square contribution (O - E)^2 / E and its share of the table's χ²
+- adjusted standardized residual (Haberman)
+      z = (O - E) / sqrt(E (1 - R_i/N) (1 - C_j/N))
+  which is approximately N(0, 1) under independence
+- two-sided p-value of z and its Holm adjustment over the cells of the table
+
+The per-project tables are taken from the contingency cube on the full
+category grid, so they all have the same shape and go through in one
+batch; cells of empty rows or columns (E = 0) are dropped from the output.
+
+Output: long format, one row per observed cell, next to the d_* cross-tabs
+(d_*_overall_posthoc.csv, d_*_by_project_posthoc.csv), so figure scripts
+can mark significant cells (`significant`, Holm-adjusted p < ALPHA)
+without recomputing anything.
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from cube import ContingencyCube
+from multitest import holm
+
+# --- optional SciPy (for the normal tail of the residuals) ---
+HAS_SCIPY = True
+try:
+    from scipy.special import erfc as scipy_erfc
+except Exception:
+    HAS_SCIPY = False
+
+ALPHA = 0.05
+
+# Chebyshev fit of erfc (Numerical Recipes, erfcc): relative error < 1.2e-7 for all x >= 0
+_ERFC_COEF = (-1.26551223, 1.00002368, 0.37409196, 0.09678418, -0.18628806,
+              0.27886807, -1.13520398, 1.48851587, -0.82215223, 0.17087277)
+
+
+def _erfc_closed_form(x: np.ndarray) -> np.ndarray:
+    """erfc(x) for x >= 0 as whole arrays (NaN stays NaN)."""
+    t = 1 / (1 + 0.5 * x)
+    poly = np.zeros_like(t)
+    for coef in reversed(_ERFC_COEF[1:]):
+        poly = (poly + coef) * t
+    return t * np.exp(-x * x + _ERFC_COEF[0] + poly)
+
+
+_erfc = scipy_erfc if HAS_SCIPY else _erfc_closed_form
+
+
+def cell_statistics(tables: np.ndarray) -> dict[str, np.ndarray]:
+    """Expected counts, χ² contributions, adjusted residuals and p-values, each (B, r, c)."""
+    tables = np.asarray(tables, dtype=float)
+    n = tables.sum(axis=(1, 2))[:, None, None]
+    rows = tables.sum(axis=2, keepdims=True)
+    cols = tables.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exp = rows * cols / n
+        contrib = np.where(exp > 0, (tables - exp) ** 2 / exp, np.nan)
+        share = contrib / np.nansum(contrib, axis=(1, 2), keepdims=True) * 100
+        var = exp * (1 - rows / n) * (1 - cols / n)
+        resid = np.where(var > 0, (tables - exp) / np.sqrt(var), np.nan)
+    p = _erfc(np.abs(resid) / math.sqrt(2))
+    p_holm = holm(p.reshape(len(tables), -1)).reshape(p.shape)
+    return {"expected": exp, "chi2_contrib": contrib, "chi2_share_pct": share,
+            "adj_resid": resid, "p_cell": p, "p_cell_holm": p_holm}
+
+
+def posthoc_frame(cube: ContingencyCube, row_var: str, col_var: str, by: str | None = None) -> pd.DataFrame:
+    """Long table of the cell statistics of row_var x col_var, overall or per label of `by`."""
+    if by is None:
+        groups, tables = [None], cube.marginal([row_var, col_var], dropna=True)[None]
+    else:
+        groups = cube.labels(by)
+        full = cube.marginal([by, row_var, col_var], dropna=True)
+        tables = full[[cube.categories[by].get_loc(g) for g in groups]]
+    stats = cell_statistics(tables)
+
+    b, r, c = tables.shape
+    g_idx, r_idx, c_idx = np.indices((b, r, c)).reshape(3, -1)
+    out = pd.DataFrame({
+        row_var: np.asarray(cube.categories[row_var])[r_idx],
+        col_var: np.asarray(cube.categories[col_var])[c_idx],
+        "count": tables.reshape(-1).astype(np.int64),
+    })
+    if by is not None:
+        out.insert(0, by, np.asarray(groups, dtype=object)[g_idx])
+    for name, values in stats.items():
+        out[name] = values.reshape(-1)
+    out["significant"] = out["p_cell_holm"] < ALPHA
+    out = out[out["expected"] > 0].reset_index(drop=True)
+    return out.round({"expected": 3, "chi2_contrib": 4, "chi2_share_pct": 1, "adj_resid": 3})
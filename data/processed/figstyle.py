@@ -0,0 +1,118 @@
+"""
+figstyle.py
+Shared style and helpers for the publication figures (make_fig1..4).
+
+Importing this module selects the non-interactive Agg backend and sets the
+rcParams once per process, so render_figures.py can draw all figures in one
+interpreter (or one per pool worker) without repeating the setup.
+
+The figures read the typed c_*/d_* tables through ../tables.py (layout and
+units come from the table schema, not from guessing); importing this module
+puts that directory on sys.path.
+"""
+
+import os
+import sys
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+from matplotlib.patches import Patch  # noqa: E402
+
+# tables.py (and buildcache.py) live one level up
+PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PARENT not in sys.path:
+    sys.path.insert(0, PARENT)
+
+# Colors (Hex)
+CTCLASS_COLORS = {
+    'A': '#FF9933',  # orange
+    'B': '#FFCC00',  # yellow
+    'C': '#CC3333'   # red
+}
+SUBTYPE_COLORS = {
+    'B1': '#FFEB99',  # light yellow
+    'B2': '#FFD966'   # darker yellow
+}
+
+CTCLASS_LABELS = {
+    'A': 'A – Compile-Time Avoidable',
+    'B': 'B – Potentially CT',
+    'C': 'C – Runtime-Only',
+}
+SUBTYPE_LABELS = {
+    'B1': 'B1 – Config/Metadata Constraints',
+    'B2': 'B2 – Contracts/Typestate',
+}
+
+# Font settings
+plt.rcParams['font.family'] = 'DejaVu Sans'
+plt.rcParams['font.size'] = 10
+
+# Output settings
+OUTPUT_DIR = 'figures'
+DPI = 300
+
+
+def legend_handles(colors, labels):
+    return [Patch(facecolor=colors[k], edgecolor='black', label=labels[k]) for k in colors]
+
+
+def style_axis(ax, grid_axis='x'):
+    """Dashed light gridlines behind the bars, no top/right spines."""
+    getattr(ax, f'{grid_axis}axis').grid(True, linestyle='--', color='#DDDDDD', linewidth=0.5, zorder=0)
+    ax.set_axisbelow(True)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+
+def panel_letter(ax, letter):
+    ax.text(-0.15, 1.05, f'({letter})', transform=ax.transAxes, fontsize=12, weight='bold')
+
+
+def project_label(proj, n):
+    """Short axis label for a project with its N."""
+    if 'cuda-quantum' in proj.lower():
+        return f"CUDA-Q\n(N={n})"
+    if 'qiskit-aer' in proj.lower():
+        return f"Qiskit Aer (GPU)\n(N={n})"
+    proj_short = proj.split('/')[-1] if '/' in proj else proj
+    return f"{proj_short}\n(N={n})"
+
+
+def stacked_bars(ax, pct, keys, colors, text_colors, horizontal=True, width=0.6, min_label=10):
+    """
+    100% stacked bars, one per row of pct (a DataFrame with a column per key),
+    with the percentage written into every segment of at least min_label %.
+    """
+    pos = np.arange(len(pct))
+    start = np.zeros(len(pct))
+    for key in keys:
+        values = pct[key].to_numpy(dtype=float)
+        if horizontal:
+            ax.barh(pos, values, height=width, left=start, color=colors[key],
+                    edgecolor='black', linewidth=1, zorder=3)
+        else:
+            ax.bar(pos, values, width=width, bottom=start, color=colors[key],
+                   edgecolor='black', linewidth=1, zorder=3)
+        for i, (s, v) in enumerate(zip(start, values)):
+            if v >= min_label:
+                xy = (s + v / 2, i) if horizontal else (i, s + v / 2)
+                ax.text(*xy, f"{v:.1f}%", ha='center', va='center',
+                        fontsize=9, color=text_colors[key], weight='bold', zorder=4)
+        start = start + values
+    return pos
+
+
+def save_figure(fig, name, output_dir=OUTPUT_DIR):
+    """Save fig as <name>.pdf and a 300-dpi <name>.png; returns both paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f'{name}.pdf'), os.path.join(output_dir, f'{name}.png')]
+    for path in paths:
+        fig.savefig(path, dpi=DPI, bbox_inches='tight')
+        print(f"✓ Saved: {path}")
+    plt.close(fig)
+    return paths
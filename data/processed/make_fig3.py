@@ -2,196 +2,27 @@
 """
 Generate Figure 3: CTClass Distribution by Bug Type
 Publication-ready output as PDF and PNG (300 dpi)
-"""
-
-import os
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
-
-# ============================================================================
-# CONFIGURATION
-# ============================================================================
-
-# Colors (Hex)
-COLORS = {
-    'A': '#FF9933',  # orange
-    'B': '#FFCC00',  # yellow
-    'C': '#CC3333'   # red
-}
-
-# Font settings
-plt.rcParams['font.family'] = 'DejaVu Sans'
-plt.rcParams['font.size'] = 10
-
-# Output settings
-OUTPUT_DIR = 'figures'
-OUTPUT_PDF = os.path.join(OUTPUT_DIR, 'fig3_bugtype_x_ctclass.pdf')
-OUTPUT_PNG = os.path.join(OUTPUT_DIR, 'fig3_bugtype_x_ctclass.png')
-
-# ============================================================================
-# LOAD DATA
-# ============================================================================
-
-print("Loading data...")
-
-# Check if files exist
-required_files = [
-    'd_bugtype_x_ctclass_overall_pct.csv',
-    'd_bugtype_x_ctclass_overall_counts.csv'
-]
-
-for fname in required_files:
-    if not os.path.exists(fname):
-        raise FileNotFoundError(f"Required file not found: {fname}")
-
-# Load data
-df_pct = pd.read_csv('d_bugtype_x_ctclass_overall_pct.csv')
-df_counts = pd.read_csv('d_bugtype_x_ctclass_overall_counts.csv')
-
-# ============================================================================
-# QUALITY CHECKS
-# ============================================================================
-
-print("Running quality checks...")
-
-# Check 1: Percentages sum to 100 for each bug type
-for idx, row in df_pct.iterrows():
-    total_pct = row['A'] + row['B'] + row['C']
-    assert 99.8 <= total_pct <= 100.2, \
-        f"BugType {row['bugtype']}: percentages sum to {total_pct}%"
-print(f"✓ All bug type percentages sum to ~100%")
-
-# Check 2: Total count consistency
-total_count = df_counts[['A', 'B', 'C']].sum().sum()
-print(f"✓ Total count across all bug types: {total_count}")
-
-# ============================================================================
-# PREPARE DATA
-# ============================================================================
-
-# Sort by B-dominance (descending) - B-heavy types on top
-df_pct = df_pct.sort_values('B', ascending=False).reset_index(drop=True)
-df_counts = df_counts.set_index('bugtype').loc[df_pct['bugtype']].reset_index()
-
-# Calculate N for each bug type
-df_pct['N'] = df_counts[['A', 'B', 'C']].sum(axis=1)
 
-# Create Y labels with N
-y_labels = [f"{row['bugtype']} (N={int(row['N'])})" 
-            for _, row in df_pct.iterrows()]
-
-# ============================================================================
-# CREATE FIGURE
-# ============================================================================
-
-print("Creating figure...")
-
-# Create output directory
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Create figure
-fig, ax = plt.subplots(figsize=(8, 4))
-
-# Y positions
-n_types = len(df_pct)
-y_pos = np.arange(n_types)
-bar_height = 0.6
-
-# Stack the bars: A (left), B (middle), C (right)
-left_a = np.zeros(n_types)
-left_b = df_pct['A'].values
-left_c = df_pct['A'].values + df_pct['B'].values
-
-# Draw stacked horizontal bars
-bars_a = ax.barh(y_pos, df_pct['A'], height=bar_height,
-                 left=left_a, color=COLORS['A'],
-                 edgecolor='black', linewidth=1, zorder=3)
-
-bars_b = ax.barh(y_pos, df_pct['B'], height=bar_height,
-                 left=left_b, color=COLORS['B'],
-                 edgecolor='black', linewidth=1, zorder=3)
-
-bars_c = ax.barh(y_pos, df_pct['C'], height=bar_height,
-                 left=left_c, color=COLORS['C'],
-                 edgecolor='black', linewidth=1, zorder=3)
-
-# Add percentage labels (only if segment >= 10%)
-# A: black, B: black, C: white
-for i in range(n_types):
-    # A segment (black text)
-    if df_pct.iloc[i]['A'] >= 10:
-        x_pos = df_pct.iloc[i]['A'] / 2
-        ax.text(x_pos, i, f"{df_pct.iloc[i]['A']:.1f}%",
-                ha='center', va='center',
-                fontsize=9, color='black', weight='bold', zorder=4)
-    
-    # B segment (black text)
-    if df_pct.iloc[i]['B'] >= 10:
-        x_pos = df_pct.iloc[i]['A'] + df_pct.iloc[i]['B'] / 2
-        ax.text(x_pos, i, f"{df_pct.iloc[i]['B']:.1f}%",
-                ha='center', va='center',
-                fontsize=9, color='black', weight='bold', zorder=4)
-    
-    # C segment (white text)
-    if df_pct.iloc[i]['C'] >= 10:
-        x_pos = df_pct.iloc[i]['A'] + df_pct.iloc[i]['B'] + df_pct.iloc[i]['C'] / 2
-        ax.text(x_pos, i, f"{df_pct.iloc[i]['C']:.1f}%",
-                ha='center', va='center',
-                fontsize=9, color='white', weight='bold', zorder=4)
-
-# Formatting
-ax.set_yticks(y_pos)
-ax.set_yticklabels(y_labels, fontsize=10)
-ax.set_xlabel('Percentage (%)', fontsize=11)
-ax.set_xlim(0, 100)
-
-# Vertical gridlines
-ax.xaxis.grid(True, linestyle='--', color='#DDDDDD', linewidth=0.5, zorder=0)
-ax.set_axisbelow(True)
-
-# Spines
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-
-# Invert y-axis so highest B is on top
-ax.invert_yaxis()
+Same layout as Figure 2 (make_fig2.ctclass_by_label), sorted by
+B-dominance so B-heavy types are on top.
+"""
 
-# ============================================================================
-# LEGEND
-# ============================================================================
+from figstyle import OUTPUT_DIR, save_figure
+from make_fig2 import ctclass_by_label
 
-# Create legend
-legend_elements = [
-    Patch(facecolor=COLORS['A'], edgecolor='black', label='A – Compile-Time Avoidable'),
-    Patch(facecolor=COLORS['B'], edgecolor='black', label='B – Potentially CT'),
-    Patch(facecolor=COLORS['C'], edgecolor='black', label='C – Runtime-Only')
+NAME = 'fig3_bugtype_x_ctclass'
+INPUTS = [
+    'd_bugtype_x_ctclass_overall_pct',
+    'd_bugtype_x_ctclass_overall_counts'
 ]
 
-# Add legend below the chart
-ax.legend(handles=legend_elements,
-         loc='upper center',
-         bbox_to_anchor=(0.5, -0.15),
-         ncol=3,
-         fontsize=9,
-         frameon=True,
-         edgecolor='black')
-
-# ============================================================================
-# SAVE FIGURE
-# ============================================================================
-
-print("Saving figure...")
-
-# Save as PDF
-plt.savefig(OUTPUT_PDF, dpi=300, bbox_inches='tight')
-print(f"✓ Saved: {OUTPUT_PDF}")
 
-# Save as PNG
-plt.savefig(OUTPUT_PNG, dpi=300, bbox_inches='tight')
-print(f"✓ Saved: {OUTPUT_PNG}")
+def render(output_dir=OUTPUT_DIR, store=None):
+    fig = ctclass_by_label(*INPUTS, label_col='bugtype', sort_by='B', what='bug type', store=store)
+    return save_figure(fig, NAME, output_dir)
 
-plt.close()
 
-print("\n✓ Figure 3 complete!")
\ No newline at end of file
+if __name__ == '__main__':
+    from render_figures import render_all
+    render_all([NAME])  # skipped when inputs and code are unchanged
+    print("\n✓ Figure 3 complete!")
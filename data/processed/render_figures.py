@@ -0,0 +1,122 @@
+# render_figures.py
+"""
+Render all publication figures in one process (or on a process pool).
+
+FIGURES is the figure registry: name -> module with a render(output_dir,
+store=None) function that reads its typed tables (../tables.py; from store
+when ../pipeline.py passes them in memory) and saves <name>.pdf and a
+300-dpi <name>.png. The modules share the style and the Agg backend of figstyle.py, so
+matplotlib, pandas and the rcParams are set up once per process instead of
+once per figure script.
+
+Each figure is fingerprinted in the build cache (../buildcache.py) by the
+files of its input tables (module INPUTS: CSV, schema, Parquet) and the
+source of the local modules it uses; figures whose fingerprint did not
+change are skipped. With unchanged tables a refresh, and every
+make_fig*.py, is a no-op.
+
+Usage:
+    python render_figures.py                    # all figures, in this process
+    python render_figures.py fig2 fig3          # only these (name prefixes)
+    python render_figures.py --workers 4        # one figure per pool worker
+    python render_figures.py --force            # ignore the build cache
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+FIGURES = {
+    'fig1_ctclass': 'make_fig1',
+    'fig2_layer_x_ctclass': 'make_fig2',
+    'fig3_bugtype_x_ctclass': 'make_fig3',
+    'fig4_b_subtype': 'make_fig4',
+}
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# the figure modules, and buildcache.py / tables.py one level up
+for path in (HERE, os.path.dirname(HERE)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from buildcache import BuildCache, code_digest, fingerprint  # noqa: E402
+from tables import table_files  # noqa: E402
+
+
+def local_sources(module):
+    """Source files of module and of the local modules (figstyle, make_fig2, ...) it takes names from."""
+    names = {module.__name__}
+    for obj in vars(module).values():
+        names.add(obj.__name__ if isinstance(obj, types.ModuleType) else getattr(obj, '__module__', None))
+    return sorted(Path(HERE, f'{n}.py') for n in names if n and Path(HERE, f'{n}.py').exists())
+
+
+def render_one(name, output_dir='figures', store=None):
+    """Render one registered figure (from the tables in store, if given); returns the written paths."""
+    return importlib.import_module(FIGURES[name]).render(output_dir, store=store)
+
+
+def figure_fingerprint(name):
+    """Build-cache fingerprint of a figure: the files of its input tables and the local source it uses."""
+    module = importlib.import_module(FIGURES[name])
+    inputs = [path for stem in module.INPUTS for path in table_files(stem)]
+    return fingerprint(code_digest(*local_sources(module), Path(HERE).parent / 'tables.py'), inputs)
+
+
+def select(prefixes):
+    if not prefixes:
+        return list(FIGURES)
+    names = [name for name in FIGURES if any(name.startswith(p) for p in prefixes)]
+    unknown = [p for p in prefixes if not any(name.startswith(p) for name in FIGURES)]
+    if unknown:
+        raise SystemExit(f"unknown figure(s) {unknown} (known: {', '.join(FIGURES)})")
+    return names
+
+
+def render_all(names=None, output_dir='figures', workers=1, force=None):
+    """
+    Render the named figures (default: all) whose fingerprint changed;
+    workers > 1 renders them on a process pool.
+    """
+    names = list(FIGURES) if names is None else names
+    cache = BuildCache(force=force)
+    fps = {name: figure_fingerprint(name) for name in names}
+    outputs = {name: [os.path.join(output_dir, f'{name}.{ext}') for ext in ('pdf', 'png')] for name in names}
+    stale = [name for name in names if not cache.fresh(name, fps[name], outputs[name])]
+    for name in names:
+        if name not in stale:
+            print(f"✓ {name} up to date (build cache)")
+
+    if workers <= 1 or len(stale) <= 1:
+        done = {name: render_one(name, output_dir) for name in stale}
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+            futures = {name: pool.submit(render_one, name, output_dir) for name in stale}
+            done = {name: f.result() for name, f in futures.items()}
+
+    for name, paths in done.items():
+        cache.record(name, fps[name], paths)
+    cache.save()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('figures', nargs='*', help='figure names or prefixes (default: all)')
+    parser.add_argument('--workers', type=int, default=1, help='render on a process pool of this size')
+    parser.add_argument('--output-dir', default='figures')
+    parser.add_argument('--force', action='store_true', default=None, help='re-render even if up to date')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    done = render_all(select(args.figures), args.output_dir, args.workers, args.force)
+    print(f"\n✓ {len(done)} figure(s) rendered in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+resampling.py
+Parallel, reproducible executor for permutation and bootstrap runs.
+
+A run of n resamples is cut into fixed chunks of CHUNK_SIZE. Chunk i draws
+from its own stream, SeedSequence(seed).spawn(n_chunks)[i], and the chunk
+results are merged in chunk order. Neither the chunking nor the streams
+depend on the number of workers, so results are bit-for-bit identical
+whether the chunks run in-process (workers <= 1) or spread over a process
+pool. Chunks of several tables are submitted together, so small tables do
+not leave cores idle.
+
+permutation_test(..., hits=h) is the sequential (Besag-Clifford) variant:
+chunks run in waves of `workers` chunks and the test stops at the h-th
+permutation whose statistic reaches the observed one, p = h / L after L
+permutations; if fewer than h are found by n_max, p = (k + 1) / (n_max + 1).
+Large p-values settle after a few hundred permutations, small ones still
+get the full n_max. Because the stopping point is located inside the chunk
+sequence, the result does not depend on the worker count either.
+
+Note: the streams differ from the single default_rng(seed) stream of
+permutation.permutation_pvalue(), so p-values agree with it statistically,
+not bitwise.
+
+Usage:
+    with ResamplingPool(workers=8) as pool:
+        pending = [pool.permutation_test(x, y, n_perm=100_000, seed=0, hits=20) for x, y in tables]
+        results = [p.result() for p in pending]   # PermutationResult(p_value, n_used, mc_se)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from permutation import chi2_observed, count_exceedances, encode, exceedance_positions
+
+CHUNK_SIZE = 1000
+
+
+def chunk_sizes(n_total: int, chunk_size: int = CHUNK_SIZE) -> list[int]:
+    full, rest = divmod(n_total, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def chunk_seeds(seed: int, n_chunks: int) -> list[np.random.SeedSequence]:
+    return np.random.SeedSequence(seed).spawn(n_chunks)
+
+
+class PermutationResult(NamedTuple):
+    p_value: float
+    n_used: int
+    mc_se: float  # Monte Carlo standard error of p_value
+
+
+def mc_result(p_value: float, n_used: int) -> PermutationResult:
+    return PermutationResult(p_value, n_used, math.sqrt(p_value * (1 - p_value) / n_used))
+
+
+def besag_clifford(hits: np.ndarray, n_max: int, h: int) -> PermutationResult:
+    """hits: sorted 0-based positions of exceedances among the first n_max permutations."""
+    if len(hits) >= h:
+        n_used = int(hits[h - 1]) + 1
+        return mc_result(h / n_used, n_used)
+    return mc_result((len(hits) + 1) / (n_max + 1), n_max)
+
+
+def _permutation_chunk(x, y, r, c, chi2_obs, exp, seed_seq, n):
+    return count_exceedances(x, y, r, c, chi2_obs, exp, np.random.default_rng(seed_seq), n)
+
+
+def _permutation_hits_chunk(x, y, r, c, chi2_obs, exp, seed_seq, n):
+    return exceedance_positions(x, y, r, c, chi2_obs, exp, np.random.default_rng(seed_seq), n)
+
+
+class Pending:
+    """Result of one chunked run; result() merges the chunk results in chunk order."""
+
+    def __init__(self, futures: list[Future], merge):
+        self.futures = futures
+        self.merge = merge
+
+    def result(self):
+        return self.merge([f.result() for f in self.futures])
+
+
+class SequentialPending:
+    """Besag-Clifford run: submits chunks wave by wave until h exceedances are found."""
+
+    def __init__(self, pool: "ResamplingPool", fn, args: tuple, n_max: int, seed: int, h: int):
+        self.pool, self.fn, self.args = pool, fn, args
+        self.n_max, self.h = n_max, h
+        self.sizes = chunk_sizes(n_max, pool.chunk_size)
+        self.seeds = chunk_seeds(seed, len(self.sizes))
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype(int)
+        self.futures = []
+        self._submit_wave()  # start right away so several tables share the pool
+
+    def _submit_wave(self):
+        start = len(self.futures)
+        for i in range(start, min(start + max(self.pool.workers, 1), len(self.sizes))):
+            self.futures.append(self.pool._submit(self.fn, *self.args, self.seeds[i], self.sizes[i]))
+
+    def result(self) -> PermutationResult:
+        hits, i = [], 0
+        while len(hits) < self.h and i < len(self.sizes):
+            if i == len(self.futures):
+                self._submit_wave()
+            hits.extend(self.futures[i].result() + self.offsets[i])
+            i += 1
+        for f in self.futures[i:]:
+            f.cancel()  # speculative chunks past the stopping point
+        return besag_clifford(np.asarray(hits), self.n_max, self.h)
+
+
+class ResamplingPool:
+    def __init__(self, workers: int | None = None, chunk_size: int = CHUNK_SIZE):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.executor = None
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def _submit(self, fn, *args) -> Future:
+        if self.executor is not None:
+            return self.executor.submit(fn, *args)
+        f = Future()
+        f.set_result(fn(*args))
+        return f
+
+    def map_chunks(self, fn, args: tuple, n_total: int, seed: int, merge) -> Pending:
+        """
+        Run fn(*args, seed_seq, n) for every chunk of n_total resamples;
+        merge receives the list of chunk results in chunk order.
+        """
+        sizes = chunk_sizes(n_total, self.chunk_size)
+        seeds = chunk_seeds(seed, len(sizes))
+        return Pending([self._submit(fn, *args, s, n) for s, n in zip(seeds, sizes)], merge)
+
+    def permutation_test(self, x, y, n_perm: int, seed: int, hits: int | None = None):
+        """
+        Pending PermutationResult for chi-square independence. hits=None runs all
+        n_perm permutations, p = (count_ge + 1) / (n_perm + 1); hits=h stops early
+        (Besag-Clifford) with n_perm as the maximum.
+        """
+        x, r = encode(x)
+        y, c = encode(y)
+        chi2_obs, exp = chi2_observed(x, y, r, c)
+        args = (x, y, r, c, chi2_obs, exp)
+        if hits is not None:
+            return SequentialPending(self, _permutation_hits_chunk, args, n_perm, seed, hits)
+        return self.map_chunks(_permutation_chunk, args, n_perm, seed,
+                               merge=lambda counts: mc_result((sum(counts) + 1) / (n_perm + 1), n_perm))
@@ -0,0 +1,155 @@
+"""
+scheduler.py
+Dependency-graph scheduler for the analysis stages (used by pipeline.py).
+
+A Stage declares the artifacts it needs (inputs) and the ones it makes
+(outputs); artifacts are named values such as the ingest table or a typed
+table like "c_ctclass_overall". The graph is checked up front (unique
+names, one producer per artifact, every input produced or given, no
+cycles). A stage starts as soon as all stages producing its inputs are
+done, so independent stages run concurrently on a process pool and the
+wall time comes down to the critical path.
+
+Progress is streamed as stages start and finish. When a stage fails (or
+does not produce an artifact it declared), every stage that depends on it,
+directly or transitively, is skipped; independent stages still run. With
+workers <= 1 the stages run in-process in declaration order, without
+pickling their inputs.
+
+Usage:
+    stages = [Stage("ingest", load, (), ("coded",)),
+              Stage("counts", count, ("coded",), ("c_ctclass_overall",))]
+    artifacts, results = run_stages(stages, workers=4)
+    # results: name -> StageResult(name, status, seconds, error)
+"""
+
+from __future__ import annotations
+
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, NamedTuple
+
+DONE, FAILED, SKIPPED = "done", "failed", "skipped"
+# the stage scripts exit via sys.exit on unusable input; that fails the stage, not the run
+STAGE_ERRORS = (Exception, SystemExit)
+
+
+class StageGraphError(ValueError):
+    pass
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable[[dict], dict]  # inputs (artifact -> value) -> outputs (artifact -> value)
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+
+
+class StageResult(NamedTuple):
+    name: str
+    status: str  # DONE, FAILED or SKIPPED
+    seconds: float
+    error: str = ""
+
+
+def check_graph(stages: list[Stage], given=()) -> dict[str, set[str]]:
+    """Upstream stage names of every stage; raises StageGraphError for an invalid graph."""
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise StageGraphError(f"duplicate stage names in {names}")
+    producers = {}
+    for stage in stages:
+        for artifact in stage.outputs:
+            if artifact in producers or artifact in given:
+                raise StageGraphError(f"{artifact!r} produced by {producers.get(artifact, 'given')} and {stage.name}")
+            producers[artifact] = stage.name
+    missing = {a: s.name for s in stages for a in s.inputs if a not in producers and a not in given}
+    if missing:
+        raise StageGraphError(f"inputs without a producer: {missing}")
+    upstream = {s.name: {producers[a] for a in s.inputs if a in producers} for s in stages}
+
+    # Kahn: a cycle leaves stages that never become ready
+    ready = [n for n in names if not upstream[n]]
+    seen = set()
+    while ready:
+        seen.add(ready.pop())
+        ready += [n for n in names if n not in seen and n not in ready and upstream[n] <= seen]
+    if len(seen) != len(names):
+        raise StageGraphError(f"cycle among stages {sorted(set(names) - seen)}")
+    return upstream
+
+
+def _run_stage(func, inputs: dict) -> tuple[dict, float]:
+    start = time.perf_counter()
+    outputs = func(inputs)
+    return outputs, time.perf_counter() - start
+
+
+def _submit(executor, fn, *args) -> Future:
+    f = Future()
+    try:
+        if executor is not None:
+            return executor.submit(fn, *args)  # raises if a crashed worker broke the pool
+        f.set_result(fn(*args))
+    except STAGE_ERRORS as exc:
+        f.set_exception(exc)
+    return f
+
+
+def run_stages(stages: list[Stage], workers: int = 1, artifacts: dict | None = None,
+               log: Callable[[str], None] = print) -> tuple[dict, dict[str, StageResult]]:
+    """
+    Run the stage graph; returns (artifacts, results). Stage failures are
+    reported in results, not raised; an invalid graph raises StageGraphError.
+    """
+    artifacts = dict(artifacts or {})
+    upstream = check_graph(stages, given=artifacts)
+    pending = {s.name: s for s in stages}
+    results: dict[str, StageResult] = {}
+    running: dict[Future, Stage] = {}
+    total = len(stages)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def finish(result: StageResult, note: str) -> None:
+        results[result.name] = result
+        log(f"[{len(results)}/{total}] {note}")
+
+    try:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                blocked = [u for u in upstream[name] if u in results and results[u].status != DONE]
+                if blocked:
+                    del pending[name]
+                    finish(StageResult(name, SKIPPED, 0.0, f"after {', '.join(sorted(blocked))}"),
+                           f"⊘ {name} skipped ({', '.join(sorted(blocked))} did not finish)")
+                elif all(results.get(u, StageResult(u, "", 0.0)).status == DONE for u in upstream[name]):
+                    absent = [a for a in stage.inputs if a not in artifacts]
+                    del pending[name]
+                    if absent:
+                        finish(StageResult(name, SKIPPED, 0.0, f"missing {absent}"),
+                               f"⊘ {name} skipped (inputs not produced: {', '.join(absent)})")
+                        continue
+                    log(f"  → {name} started")
+                    inputs = {a: artifacts[a] for a in stage.inputs}
+                    running[_submit(executor, _run_stage, stage.func, inputs)] = stage
+            if not running:
+                continue  # only skips happened; re-check what became blocked
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    outputs, seconds = future.result()
+                except STAGE_ERRORS as exc:
+                    error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+                    finish(StageResult(stage.name, FAILED, 0.0, error), f"✗ {stage.name} failed: {error}")
+                    continue
+                artifacts.update({a: outputs[a] for a in stage.outputs if a in outputs})
+                absent = [a for a in stage.outputs if a not in outputs]
+                note = f" (did not produce {', '.join(absent)})" if absent else ""
+                finish(StageResult(stage.name, DONE, seconds), f"✓ {stage.name} {seconds:.2f}s{note}")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return artifacts, results
@@ -0,0 +1,48 @@
+"""
+schema.py
+Canonical categorical schema for the coded labels.
+
+Every label column of the ingest table is a pandas Categorical, so group-bys
+and crosstabs run on small integer codes instead of Python strings, and the
+category order is the same in every table and figure.
+
+- Closed vocabularies have a fixed order (LABEL_ORDER). Values outside it are
+  kept, appended after the fixed ones in sorted order, so validation can
+  still report them.
+- Open vocabularies (project, stacklayer, bugtype, ...) are ordered
+  alphabetically, which is the order the outputs always had.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+
+CTCLASS_ORDER = ["A", "B", "C"]
+CTSUBTYPE_ORDER = ["B1", "B2", "Missing"]
+SOURCE_ORDER = ["cudaq", "qiskit"]
+
+LABEL_ORDER = {
+    "source": SOURCE_ORDER,
+    "ctclass": CTCLASS_ORDER,
+    "ctsubtype_norm": CTSUBTYPE_ORDER,
+}
+OPEN_LABELS = ["project", "status_norm", "stacklayer", "bugtype"]
+
+
+def as_categorical(values: pd.Series, order: list[str] | None = None) -> pd.Series:
+    """Series -> Categorical with `order` first, any other observed values sorted after it."""
+    order = list(order or [])
+    extra = sorted(set(values.dropna().unique()) - set(order))
+    return values.astype(pd.CategoricalDtype(order + extra))
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast all known label columns present in df to their canonical categorical dtype."""
+    df = df.copy()
+    for col, order in LABEL_ORDER.items():
+        if col in df.columns:
+            df[col] = as_categorical(df[col], order)
+    for col in OPEN_LABELS:
+        if col in df.columns:
+            df[col] = as_categorical(df[col])
+    return df
@@ -0,0 +1,204 @@
+"""
+tables.py
+Typed, schema-tagged intermediate tables (the c_*/d_* outputs of 02 and 03).
+
+Every table is declared by a TableSchema when it is written:
+    layout  "long": one row per cell; the last key is the category the
+            counts/percentages are taken over, the keys before it group
+            the rows (e.g. project)
+            "wide": one row per label, one value column per category
+    keys    label columns
+    values  value columns (long: count, total, percent, ...; wide: the
+            category levels, e.g. A, B, C)
+    unit    what the cells of a wide table hold: "count" or "percent"
+            ("" for long tables, whose value columns are named)
+
+write_table(df, stem, schema) writes
+- <stem>.csv          unchanged, for reading and for the paper tables
+- <stem>.schema.json  the schema plus column dtypes and category orders
+- <stem>.parquet      (with pyarrow) the typed table, with the same JSON in
+                      the Arrow schema metadata (key b"table_schema")
+
+read_table(stem, layout=..., unit=...) loads the Parquet (or the CSV with
+the dtypes of the sidecar), so labels come back as Categoricals in the
+order of schema.py, and raises TableSchemaError if the declared layout is
+not what the caller expects. With store= (stem -> tagged DataFrame, as
+pipeline.py passes them between stages) the table is taken from memory
+and checked the same way, without touching the disk. Figure scripts therefore never guess LONG vs
+WIDE or percentages vs counts; check_table runs the consistency checks
+the schema implies (row sums, count/total) vectorized over the table.
+
+Usage:
+    result = tag_table(result, TableSchema("long", ("ctclass",), DIST_VALUES))
+    write_table(result, "c_ctclass_overall")
+    df = read_table("d_project_x_ctclass_overall_pct", layout="wide", unit="percent")
+    check_table(df)
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+LAYOUTS = ("long", "wide")
+UNITS = ("count", "percent", "")
+METADATA_KEY = b"table_schema"
+# bump when the stored schema layout changes
+SCHEMA_VERSION = 1
+
+# value columns of the c_* distributions (02) and of the d_*_ci tables (03)
+DIST_VALUES = ("count", "total", "percent", "pct_ci_low", "pct_ci_high")
+CI_VALUES = ("count", "row_total", "percent", "pct_ci_low", "pct_ci_high")
+
+PCT_TOL = 0.2  # rounded row percentages (1 decimal) may miss 100 by this much
+
+
+class TableSchemaError(ValueError):
+    pass
+
+
+class TableSchema(NamedTuple):
+    layout: str
+    keys: tuple[str, ...]
+    values: tuple[str, ...]
+    unit: str = ""
+
+
+def table_files(stem) -> list[Path]:
+    """All files of a table (whether or not they exist), e.g. for build-cache fingerprints."""
+    return [Path(f"{stem}{ext}") for ext in (".parquet", ".csv", ".schema.json")]
+
+
+def _metadata(df: pd.DataFrame, schema: TableSchema) -> dict:
+    return {
+        "version": SCHEMA_VERSION,
+        **schema._asdict(),
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "categories": {col: list(map(str, df[col].cat.categories))
+                       for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)},
+    }
+
+
+def _schema(meta: dict) -> TableSchema:
+    return TableSchema(meta["layout"], tuple(meta["keys"]), tuple(meta["values"]), meta["unit"])
+
+
+def tag_table(df: pd.DataFrame, schema: TableSchema) -> pd.DataFrame:
+    """Attach schema to df (df.attrs["table_schema"]) after checking it; returns df."""
+    if schema.layout not in LAYOUTS or schema.unit not in UNITS:
+        raise TableSchemaError(f"unknown layout/unit {schema.layout!r}/{schema.unit!r}")
+    missing = [c for c in schema.keys + schema.values if c not in df.columns]
+    if missing:
+        raise TableSchemaError(f"declared columns {missing} not in the table")
+    df.attrs["table_schema"] = schema
+    return df
+
+
+def write_table(df: pd.DataFrame, stem, schema: TableSchema | None = None) -> list[str]:
+    """
+    Write df as <stem>.csv + .schema.json (+ .parquet with pyarrow); returns the
+    written paths. schema defaults to the one attached by tag_table.
+    """
+    schema = schema or df.attrs["table_schema"]
+    tag_table(df, schema)
+    parquet_file, csv_file, schema_file = table_files(stem)
+    meta = _metadata(df, schema)
+    df.to_csv(csv_file, index=False)
+    schema_file.write_text(json.dumps(meta, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+    paths = [str(csv_file), str(schema_file)]
+    if HAS_PYARROW:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               METADATA_KEY: json.dumps(meta).encode()})
+        pq.write_table(table, parquet_file)
+        paths.insert(0, str(parquet_file))
+    return paths
+
+
+def _read_csv(csv_file: Path, meta: dict) -> pd.DataFrame:
+    # labels as strings (a year or an issue id must not turn into a number), the rest as declared
+    dtypes = {col: (str if dtype in ("object", "category") else dtype) for col, dtype in meta["dtypes"].items()}
+    df = pd.read_csv(csv_file, dtype=dtypes)
+    for col, cats in meta["categories"].items():
+        typed = df[col].astype(pd.CategoricalDtype(cats))
+        unknown = df.loc[typed.isna() & df[col].notna(), col].unique()
+        if len(unknown):
+            raise TableSchemaError(f"{csv_file}: {col} labels {list(unknown)} not in the declared categories")
+        df[col] = typed
+    return df
+
+
+def read_table(stem, layout: str | None = None, unit: str | None = None,
+               keys=None, values=None, store: dict | None = None) -> pd.DataFrame:
+    """
+    Load a table written by write_table (or take it from store) and check its
+    declared schema: layout/unit must match, keys/values must include the
+    given columns. The schema is returned in df.attrs["table_schema"].
+    Tables from store are shared, not copied; treat them as read-only.
+    """
+    parquet_file, csv_file, schema_file = table_files(stem)
+    if store is not None:
+        if stem not in store:
+            raise TableSchemaError(f"{stem}: not produced by this run (have: {', '.join(sorted(store))})")
+        df = store[stem]
+        meta = df.attrs["table_schema"]._asdict()
+    elif HAS_PYARROW and parquet_file.exists():
+        table = pq.read_table(parquet_file)
+        meta = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b"null"))
+        if meta is None:
+            raise TableSchemaError(f"{parquet_file}: no {METADATA_KEY.decode()} metadata")
+        df = table.to_pandas()
+    elif csv_file.exists() and schema_file.exists():
+        meta = json.loads(schema_file.read_text(encoding="utf-8"))
+        df = _read_csv(csv_file, meta)
+    elif csv_file.exists():
+        raise TableSchemaError(f"{csv_file} has no schema ({schema_file.name}); re-run the stage that writes it")
+    else:
+        raise FileNotFoundError(f"Required table not found: {csv_file}")
+
+    schema = _schema(meta)
+    expected = {"layout": layout, "unit": unit}
+    wrong = {k: getattr(schema, k) for k, v in expected.items() if v is not None and getattr(schema, k) != v}
+    missing = [c for c in (keys or ()) if c not in schema.keys] + [c for c in (values or ()) if c not in schema.values]
+    if wrong or missing:
+        raise TableSchemaError(f"{stem}: declared {schema}, expected {expected} with keys {keys} and values {values}")
+    df.attrs["table_schema"] = schema
+    return df
+
+
+def check_table(df: pd.DataFrame, tol: float = PCT_TOL) -> None:
+    """
+    Consistency checks implied by the schema, over the whole table at once:
+    wide percent rows sum to 100 (empty rows are NaN); in long tables the
+    counts of each group sum to its total and percent = count/total.
+    """
+    schema: TableSchema = df.attrs["table_schema"]
+    bad = pd.Series(False, index=df.index)
+    if schema.layout == "wide" and schema.unit == "percent":
+        values = df[list(schema.values)].to_numpy(dtype=float)
+        sums = values.sum(axis=1)
+        bad = pd.Series(~np.isnan(sums) & (np.abs(sums - 100) > tol), index=df.index)
+    elif schema.layout == "long":
+        total = next((c for c in ("total", "row_total") if c in schema.values), None)
+        if total is not None and "count" in schema.values:
+            groups = list(schema.keys[:-1])
+            sums = df.groupby(groups, observed=True)["count"].transform("sum") if groups else df["count"].sum()
+            bad |= sums != df[total]
+            if "percent" in schema.values:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    pct = df["count"] / df[total] * 100
+                bad |= (pct - df["percent"]).abs() > 0.05 + 1e-9
+    if bad.any():
+        raise TableSchemaError(f"inconsistent rows ({schema.layout}/{schema.unit or 'values'}):\n"
+                               f"{df.loc[bad, list(schema.keys + schema.values)]}")
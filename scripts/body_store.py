@@ -0,0 +1,168 @@
+"""
+body_store.py
+Single-file, compressed store for issue bodies, keyed by (project, issue_id).
+
+Replaces the one-.txt-per-issue layout (`issues_text/<id>.txt`): bodies are
+zlib-compressed into one SQLite file whose primary key is the lookup index,
+so a corpus of many repos is one inode and readers need no open() per issue.
+Writing an existing key replaces the body (the newest fetch wins); an empty
+body is stored as well, so an issue whose body was cleared reads back as ''
+instead of keeping the old text.
+
+Usage:
+    python body_store.py migrate DATA_ROOT [--store PATH]   # import */issues_text trees
+    python body_store.py stats [--store PATH]
+    python body_store.py get PROJECT ISSUE_ID [--store PATH]
+
+Reader API:
+    with BodyStore(path) as store:
+        store.get('NVIDIA/cuda-quantum', '3433')
+        for project, issue_id, body in store.iter_bodies(project=None): ...
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+
+STORE_FILE = 'issue_bodies.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    project  TEXT NOT NULL,
+    issue_id TEXT NOT NULL,
+    body     BLOB NOT NULL,
+    PRIMARY KEY (project, issue_id)
+)
+"""
+
+
+class BodyStore:
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def put_many(self, items):
+        """items: iterable of (project, issue_id, body); a None body is stored as ''."""
+        rows = [(p, str(i), zlib.compress((b or '').encode('utf-8'))) for p, i, b in items]
+        with self.lock:
+            self.conn.executemany('INSERT OR REPLACE INTO bodies VALUES (?, ?, ?)', rows)
+            self.conn.commit()
+        return len(rows)
+
+    def put(self, project, issue_id, body):
+        return self.put_many([(project, issue_id, body)])
+
+    def get(self, project, issue_id):
+        with self.lock:
+            row = self.conn.execute('SELECT body FROM bodies WHERE project = ? AND issue_id = ?',
+                                    (project, str(issue_id))).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def iter_bodies(self, project=None):
+        """Stream (project, issue_id, body) in key order without loading everything."""
+        # separate connection so streaming does not hold the writer lock
+        conn = sqlite3.connect(self.path)
+        try:
+            if project is None:
+                cur = conn.execute('SELECT project, issue_id, body FROM bodies ORDER BY project, issue_id')
+            else:
+                cur = conn.execute('SELECT project, issue_id, body FROM bodies WHERE project = ? '
+                                   'ORDER BY issue_id', (project,))
+            for p, i, blob in cur:
+                yield p, i, zlib.decompress(blob).decode('utf-8')
+        finally:
+            conn.close()
+
+    def keys(self, project=None):
+        with self.lock:
+            if project is None:
+                return self.conn.execute('SELECT project, issue_id FROM bodies').fetchall()
+            return self.conn.execute('SELECT project, issue_id FROM bodies WHERE project = ?',
+                                     (project,)).fetchall()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM bodies').fetchone()[0]
+
+
+def project_for_dir(repo_dir):
+    """Project name of an export folder: first Project value of a CSV in it, else the folder name."""
+    for path in sorted(glob.glob(os.path.join(repo_dir, '*.csv'))):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            fields = {(c or '').strip().lower(): c for c in reader.fieldnames or []}
+            if 'project' not in fields:
+                continue
+            for row in reader:
+                value = (row.get(fields['project']) or '').strip()
+                if value and value.lower() != 'project':
+                    return value
+    return os.path.basename(os.path.normpath(repo_dir)).replace('__', '/')
+
+
+def migrate_text_trees(root, store):
+    """Import every ROOT/**/issues_text/<id>.txt into the store. Returns {project: n}."""
+    migrated = {}
+    for text_dir in sorted(glob.glob(os.path.join(root, '**', 'issues_text'), recursive=True)):
+        project = project_for_dir(os.path.dirname(text_dir))
+        items = []
+        for path in glob.glob(os.path.join(text_dir, '*.txt')):
+            with open(path, encoding='utf-8', newline='') as f:
+                items.append((project, os.path.splitext(os.path.basename(path))[0], f.read()))
+        migrated[project] = migrated.get(project, 0) + store.put_many(items)
+        print(f"  {text_dir} -> {project}: {len(items)} bodies", file=sys.stderr)
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compressed single-file issue body store.")
+    parser.add_argument('--store', default=STORE_FILE, help="store file (default: %(default)s)")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_migrate = sub.add_parser('migrate', help="import existing */issues_text trees")
+    p_migrate.add_argument('root')
+    sub.add_parser('stats', help="bodies per project")
+    p_get = sub.add_parser('get', help="print one body")
+    p_get.add_argument('project')
+    p_get.add_argument('issue_id')
+    args = parser.parse_args(argv)
+
+    with BodyStore(args.store) as store:
+        if args.cmd == 'migrate':
+            migrated = migrate_text_trees(args.root, store)
+            print(f"Migrated {sum(migrated.values())} bodies into {args.store}", file=sys.stderr)
+        elif args.cmd == 'stats':
+            counts = {}
+            for project, _ in store.keys():
+                counts[project] = counts.get(project, 0) + 1
+            for project, n in sorted(counts.items()):
+                print(f"{project}: {n}")
+            print(f"Total: {len(store)} ({os.path.getsize(args.store)} bytes)")
+        elif args.cmd == 'get':
+            body = store.get(args.project, args.issue_id)
+            if body is None:
+                print(f"No body for {args.project}#{args.issue_id}", file=sys.stderr)
+                return 1
+            print(body)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+github_api_standin.py
+Local stand-in for the GitHub search API, for exercising the scrapers offline.
+
+Serves `GET /search/issues` with synthetic bug issues for any `repo:` in the
+query. Paging, `total_count`, the 1000-result search cap, `created:A..B`,
+`updated:>=`, `sort=updated` and ETag / If-None-Match behave like GitHub;
+`--latency` adds a fixed delay per request to mimic network wait.
+`--rate-limit N --window S` enforces N requests per S seconds per token
+(X-RateLimit-* headers, 403 when exhausted); `--secondary-every K` answers
+every K-th request with a secondary-limit 403 and Retry-After.
+`POST /_touch?repo=OWNER/NAME&number=N` marks an issue as updated now.
+`POST /graphql` answers the GraphQL backend's search query (variables only,
+the query text is not parsed) with synthetic labels, comments and timeline;
+some issues have more of them than one page holds, and the follow-up
+`node(id:)` queries page through the rest. An exhausted rate limit is
+reported the GraphQL way: HTTP 200 with errors[].type == "RATE_LIMITED".
+
+Usage:
+    python github_api_standin.py [--port 8765] [--issues 350] [--latency 0.2]
+    python github_issues_scraper.py --api-url http://127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+SEARCH_CAP = 1000
+START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+
+def cursor(offset):
+    return base64.b64encode(str(offset).encode()).decode()
+
+
+def offset_of(after):
+    return int(base64.b64decode(after).decode()) if after else 0
+
+
+def connection(items, first, after=None):
+    """A GraphQL connection page over items."""
+    offset = offset_of(after)
+    page = items[offset:offset + first]
+    end = offset + len(page)
+    return {'totalCount': len(items), 'pageInfo': {'hasNextPage': end < len(items), 'endCursor': cursor(end)},
+            'nodes': page}
+
+
+def nested_items(issue):
+    """Labels, comments and timeline events of a synthetic issue; every 5th/7th/11th one is busy."""
+    n, created = issue['number'], issue['created_at']
+    labels = [{'name': 'bug'}] + [{'name': f'area-{k}'} for k in range(30 if n % 11 == 0 else 0)]
+    comments = [{'author': {'login': f'user{k}'}, 'createdAt': created, 'body': f'comment {k}'}
+                for k in range(70 if n % 7 == 0 else n % 4)]
+    timeline = [{'__typename': 'LabeledEvent', 'createdAt': created, 'label': {'name': 'bug'}}]
+    for k in range(60 if n % 5 == 0 else 0):
+        timeline.append({'__typename': 'UnlabeledEvent' if k % 2 else 'LabeledEvent', 'createdAt': created,
+                         'label': {'name': f'triage-{k // 2}'}})
+    timeline.append({'__typename': 'CrossReferencedEvent', 'createdAt': issue['updated_at'],
+                     'source': {'number': 10000 + n, 'url': f"{issue['html_url']}-pr", 'state': 'MERGED',
+                                'merged': True}})
+    return {'labels': labels, 'comments': comments, 'timelineItems': timeline}
+
+
+def make_issues(repo, n):
+    issues = []
+    for i in range(1, n + 1):
+        created = START + timedelta(hours=7 * i)
+        issues.append({
+            'number': i,
+            'html_url': f"https://github.com/{repo}/issues/{i}",
+            'title': f"Synthetic issue {i} in {repo}",
+            'state': 'closed' if i % 3 else 'open',
+            'created_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'updated_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'body': f"Body of issue {i}\n" * (1 + i % 5),
+        })
+    return issues
+
+
+class StandinAPI:
+    def __init__(self, issues_per_repo, latency, rate_limit=0, window=60.0, secondary_every=0):
+        self.issues_per_repo = issues_per_repo
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.secondary_every = secondary_every
+        self.repos = {}
+        self.requests = 0
+        self.windows = {}  # token -> (window reset epoch, used)
+
+    def check_rate_limit(self, request):
+        """Returns (headers, error response or None)."""
+        if self.secondary_every and self.requests % self.secondary_every == 0:
+            return {}, web.json_response({'message': 'You have exceeded a secondary rate limit.'},
+                                         status=403, headers={'Retry-After': '1'})
+        if not self.rate_limit:
+            return {}, None
+        token = request.headers.get('Authorization', '')
+        now = time.time()
+        reset, used = self.windows.get(token, (now + self.window, 0))
+        if now >= reset:
+            reset, used = now + self.window, 0
+        headers = {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Reset': str(int(reset) + 1),
+        }
+        if used >= self.rate_limit:
+            headers['X-RateLimit-Remaining'] = '0'
+            return headers, web.json_response({'message': 'API rate limit exceeded'},
+                                              status=403, headers=headers)
+        self.windows[token] = (reset, used + 1)
+        headers['X-RateLimit-Remaining'] = str(self.rate_limit - used - 1)
+        return headers, None
+
+    def issues_for(self, repo):
+        if repo not in self.repos:
+            self.repos[repo] = make_issues(repo, self.issues_per_repo)
+        return self.repos[repo]
+
+    def matching_issues(self, query, sort=None, order=None):
+        match = re.search(r'repo:(\S+)', query)
+        if not match:
+            return None
+        issues = self.issues_for(match.group(1))
+        created = re.search(r'created:(\S+)\.\.(\S+)', query)
+        if created:
+            lo, hi = created.groups()
+            lo = lo if 'T' in lo else lo + 'T00:00:00Z'
+            hi = hi if 'T' in hi else hi + 'T23:59:59Z'
+            issues = [i for i in issues if lo <= i['created_at'] <= hi]
+        updated = re.search(r'updated:>=(\S+)', query)
+        if updated:
+            issues = [i for i in issues if i['updated_at'] >= updated.group(1)]
+        if sort == 'updated':
+            issues = sorted(issues, key=lambda i: i['updated_at'], reverse=order != 'asc')
+        return issues
+
+    async def search_issues(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        limit_headers, error = self.check_rate_limit(request)
+        if error is not None:
+            return error
+
+        issues = self.matching_issues(request.query.get('q', ''),
+                                      request.query.get('sort'), request.query.get('order'))
+        if issues is None:
+            return web.json_response({'message': 'Validation Failed'}, status=422)
+        per_page = min(int(request.query.get('per_page', 30)), 100)
+        page = int(request.query.get('page', 1))
+
+        start = (page - 1) * per_page
+        if start >= SEARCH_CAP:
+            return web.json_response(
+                {'message': 'Only the first 1000 search results are available'}, status=422)
+        items = issues[start:min(start + per_page, SEARCH_CAP)]
+        body = json.dumps({
+            'total_count': len(issues),
+            'incomplete_results': False,
+            'items': items,
+        })
+        etag = '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag, **limit_headers})
+        return web.Response(text=body, content_type='application/json',
+                            headers={'ETag': etag, **limit_headers})
+
+    async def graphql(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        limit_headers, error = self.check_rate_limit(request)
+        if error is not None and limit_headers.get('X-RateLimit-Remaining') == '0':
+            return web.json_response({'errors': [{'type': 'RATE_LIMITED', 'message': 'API rate limit exceeded'}]},
+                                     headers=limit_headers)
+        if error is not None:
+            return error
+
+        payload = await request.json()
+        variables = payload['variables']
+        rate_limit = {'cost': 1, 'remaining': 4999, 'resetAt': None}
+        if 'id' in variables:
+            # follow-up query: the next page of one nested connection of one issue
+            name = re.search(r'node\(id: \$id\)\s*\{\s*\.\.\. on Issue\s*\{\s*(\w+)', payload['query']).group(1)
+            repo, number = variables['id'].rsplit('#', 1)
+            issue = self.issues_for(repo)[int(number) - 1]
+            page = connection(nested_items(issue)[name], variables['first'], variables.get('after'))
+            return web.json_response({'data': {'rateLimit': rate_limit, 'node': {name: page}}},
+                                     headers=limit_headers)
+
+        issues = self.matching_issues(variables['q'])
+        if issues is None:
+            return web.json_response({'errors': [{'message': 'invalid search query'}]})
+        repo = re.search(r'repo:(\S+)', variables['q']).group(1)
+        firsts = {'labels': variables['labels'], 'comments': variables['comments'],
+                  'timelineItems': variables['events']}
+
+        def node(i):
+            nested = nested_items(i)
+            return {
+                'id': f"{repo}#{i['number']}",
+                'number': i['number'], 'url': i['html_url'], 'title': i['title'], 'state': i['state'].upper(),
+                'createdAt': i['created_at'], 'updatedAt': i['updated_at'],
+                'closedAt': i['updated_at'] if i['state'] == 'closed' else None, 'body': i['body'],
+                **{name: connection(items, firsts[name]) for name, items in nested.items()},
+            }
+
+        page = connection(issues[:SEARCH_CAP], variables['first'], variables.get('after'))
+        return web.json_response({'data': {
+            'rateLimit': rate_limit,
+            'search': {'issueCount': len(issues), 'pageInfo': page['pageInfo'],
+                       'nodes': [node(i) for i in page['nodes']]},
+        }}, headers=limit_headers)
+
+    async def touch(self, request):
+        issue = self.issues_for(request.query['repo'])[int(request.query['number']) - 1]
+        issue['updated_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        issue['title'] += ' (edited)'
+        return web.json_response(issue)
+
+
+def make_app(issues_per_repo=350, latency=0.0, rate_limit=0, window=60.0, secondary_every=0):
+    api = StandinAPI(issues_per_repo, latency, rate_limit, window, secondary_every)
+    app = web.Application()
+    app['api'] = api
+    app.router.add_get('/search/issues', api.search_issues)
+    app.router.add_post('/_touch', api.touch)
+    app.router.add_post('/graphql', api.graphql)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the GitHub search API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--issues', type=int, default=350, help="synthetic issues per repo")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds of delay per request")
+    parser.add_argument('--rate-limit', type=int, default=0, help="requests per window and token (0 = off)")
+    parser.add_argument('--window', type=float, default=60.0, help="rate-limit window in seconds")
+    parser.add_argument('--secondary-every', type=int, default=0,
+                        help="answer every K-th request with a secondary limit (0 = off)")
+    args = parser.parse_args()
+    app = make_app(args.issues, args.latency, args.rate_limit, args.window, args.secondary_every)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
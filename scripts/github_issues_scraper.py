@@ -0,0 +1,523 @@
+"""
+github_issues_scraper.py
+Async multi-repo scraper for GitHub bug issues.
+
+All repos share one aiohttp connection pool; concurrency per host is bounded
+by the connector. Pages of a repo are fetched concurrently once the first
+page has reported `total_count`, and issue bodies are appended to the shared
+body store (see body_store.py) off the event loop while the next pages are
+still in flight.
+
+The search API stops after 1000 results per query, so the `created:` range
+is split recursively into windows that each stay under that cap; all windows
+are fetched concurrently and deduplicated by (Project, IssueID).
+
+Rows are streamed page by page into a sink (see sinks.py) and flushed, so
+memory does not grow with the number of issues. A full run writes to
+github_issues.<sink>.partial and replaces the previous file only when the
+repo has completed, so a failed or aborted run keeps the last good output
+(and its own rows in github_issues.<sink>.failed).
+--sink picks the format of the per-repo file.
+
+Requests go through a rate-limit-aware scheduler (see rate_limit.py) that
+rotates over all tokens in GITHUB_TOKENS (comma-separated) or GITHUB_TOKEN,
+waits for resets and retries rate-limited requests instead of stopping.
+
+With --backend graphql, issues are fetched through the GraphQL API together
+with comments, labels, label history and linked PRs (see graphql_backend.py).
+
+Every response is recorded in a content-addressed cache (see
+response_cache.py); cached pages are revalidated with their ETag, and
+--offline rebuilds all outputs from the cache without any request.
+
+With --incremental, each repo keeps a checkpoint (see scrape_state.py):
+only issues updated since the last completed run are requested, page 1 is
+sent with If-None-Match so an unchanged result costs one 304, and each
+shard is paged sequentially by an updated_at cursor, so issues updated
+mid-run cannot shift others past a finished page. Every page is appended
+to the CSV and recorded immediately, so an interrupted run resumes where
+it stopped.
+
+Usage:
+    python github_issues_scraper.py [--repo OWNER/NAME ...] [--out-dir DIR]
+                                    [--api-url URL] [--per-host N]
+                                    [--incremental] [--store PATH]
+                                    [--backend rest|graphql]
+                                    [--sink csv|jsonl|sqlite]
+                                    [--cache PATH] [--offline]
+
+Outputs:
+- OUT_DIR/issue_bodies.sqlite: bodies of all repos, keyed by (Project, IssueID)
+- OUT_DIR/http_cache.sqlite: raw API responses, compressed and deduplicated by hash
+- per repo, in OUT_DIR/<owner>__<name>/:
+  - github_issues.csv (or .jsonl / .sqlite with --sink; incremental runs
+    append to the CSV and compact it by IssueID, keeping the last
+    occurrence, when the run completes)
+  - .scrape_state.json (incremental runs only)
+  - issue_details.jsonl (GraphQL backend only)
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+
+from body_store import STORE_FILE, BodyStore
+from rate_limit import RateLimitScheduler
+from response_cache import CACHE_FILE, ResponseCache, cache_key
+from scrape_state import Checkpoint, request_key
+from sinks import CsvSink, open_sink
+
+API_URL = "https://api.github.com"
+CREATED_RANGE = "2023-01-01..2025-11-19"
+PER_PAGE = 100
+SEARCH_CAP = 1000  # GitHub search never returns more than 1000 results per query
+PER_HOST = 8
+
+REPOS = [
+    'NVIDIA/cuda-quantum',
+    'Qiskit/qiskit-aer',
+]
+
+
+class GitHubError(Exception):
+    def __init__(self, status, message=''):
+        super().__init__(f"HTTP {status}: {message[:200]}")
+        self.status = status
+
+
+def build_query(repo, created=CREATED_RANGE):
+    return f"repo:{repo} is:issue label:bug created:{created}"
+
+
+def parse_created_range(created=CREATED_RANGE):
+    """'YYYY-MM-DD..YYYY-MM-DD' -> (start, end) as UTC datetimes, end day inclusive."""
+    start, end = (datetime.fromisoformat(s.replace('Z', '+00:00')) for s in created.split('..'))
+    start, end = (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc) for ts in (start, end))
+    if 'T' not in created.split('..')[1]:
+        end += timedelta(days=1, seconds=-1)
+    return start, end
+
+
+def format_ts(ts):
+    return ts.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def window_query(repo, start, end, extra=''):
+    return build_query(repo, f"{format_ts(start)}..{format_ts(end)}") + extra
+
+
+def n_pages(total_count, per_page=PER_PAGE):
+    return max(1, math.ceil(min(total_count, SEARCH_CAP) / per_page))
+
+
+def repo_dir(out_dir, repo):
+    return os.path.join(out_dir, repo.replace('/', '__'))
+
+
+def issue_to_row(repo, issue):
+    return {
+        'Project': repo,
+        'IssueID': str(issue['number']),
+        'URL': issue['html_url'],
+        'Title': issue['title'],
+        'Status': issue['state'],
+        'CreatedAt': issue['created_at']
+    }
+
+
+def tokens_from_env():
+    tokens = os.environ.get('GITHUB_TOKENS') or os.environ.get('GITHUB_TOKEN') or ''
+    return [t.strip() for t in tokens.split(',') if t.strip()]
+
+
+class GitHubClient:
+    """
+    Shared HTTP session for all repos; counts pages for throughput stats.
+    With a ResponseCache, 200 responses are recorded and cached GETs are
+    revalidated with their ETag; offline=True answers from the cache only.
+    """
+
+    def __init__(self, api_url=API_URL, tokens=None, per_host=PER_HOST, cache=None, offline=False):
+        if offline and cache is None:
+            raise ValueError("offline mode needs a response cache")
+        self.api_url = api_url.rstrip('/')
+        self.scheduler = RateLimitScheduler(tokens)
+        self.per_host = per_host
+        self.cache = cache
+        self.offline = offline
+        self.session = None
+        self.pages = 0
+        self.not_modified = 0
+
+    async def __aenter__(self):
+        if not self.offline:
+            headers = {'Accept': 'application/vnd.github+json'}
+            connector = aiohttp.TCPConnector(limit_per_host=self.per_host)
+            self.session = aiohttp.ClientSession(connector=connector, headers=headers)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.session is not None:
+            await self.session.close()
+
+    async def get_json(self, path, params, etag=None):
+        """
+        GET path and return (data, etag). With etag, the request is
+        conditional and data is None if the server answers 304.
+        """
+        return await self.request('GET', path, params=params, etag=etag)
+
+    async def post_json(self, path, payload):
+        data, _ = await self.request('POST', path, payload=payload)
+        return data
+
+    async def request(self, method, path, params=None, payload=None, etag=None):
+        url = f"{self.api_url}/{path}"
+        key = cache_key(method, url, params, payload) if self.cache else None
+        if self.offline:
+            data = self.cache.get(key)
+            if data is None:
+                raise GitHubError(404, f"not in response cache (offline): {key}")
+            return data, self.cache.etag(key)
+
+        # the caller's ETag means "tell me if unchanged"; ours means "send the cached copy"
+        revalidate = etag is None and method == 'GET' and self.cache is not None
+        sent_etag = self.cache.etag(key) if revalidate else etag
+        for _ in range(self.scheduler.max_retries + 1):
+            bucket = await self.scheduler.acquire()
+            headers = {}
+            if bucket.token:
+                headers['Authorization'] = f"Bearer {bucket.token}"
+            if sent_etag:
+                headers['If-None-Match'] = sent_etag
+            async with self.session.request(method, url, params=params, json=payload,
+                                            headers=headers) as response:
+                # 403 bodies tell secondary limits apart; GraphQL (POST) reports its limit in a 200 body
+                body = await response.text() if response.status == 403 or method == 'POST' else ''
+                status = 429 if response.status == 200 and graphql_rate_limited(body) else response.status
+                if self.scheduler.update(bucket, status, response.headers, body):
+                    continue
+                if response.status == 304:
+                    self.not_modified += 1
+                    if revalidate:
+                        return self.cache.get(key), sent_etag
+                    return None, etag
+                if response.status != 200:
+                    raise GitHubError(response.status, await response.text())
+                raw = await response.read()
+                new_etag = response.headers.get('ETag')
+            data = json.loads(raw)
+            if self.cache is not None:
+                self.cache.put(key, raw, new_etag)
+            self.pages += 1
+            return data, new_etag
+        raise GitHubError(403, f"still rate limited after {self.scheduler.max_retries} retries: {url}")
+
+
+def graphql_rate_limited(body):
+    """GraphQL reports an exhausted rate limit as HTTP 200 with errors[].type == 'RATE_LIMITED'."""
+    if 'RATE_LIMITED' not in body:
+        return False
+    return any(e.get('type') == 'RATE_LIMITED' for e in json.loads(body).get('errors') or ())
+
+
+def search_params(query, page, per_page=PER_PAGE, sort=None):
+    params = {'q': query, 'per_page': per_page, 'page': page}
+    if sort:
+        # stable order for incremental paging: oldest update first
+        params.update({'sort': sort, 'order': 'asc'})
+    return params
+
+
+async def fetch_search_page(client, query, page, per_page=PER_PAGE):
+    data, _ = await client.get_json('search/issues', search_params(query, page, per_page))
+    return data
+
+
+async def save_bodies(store, repo, issues):
+    items = [(repo, issue['number'], issue.get('body') or '') for issue in issues]
+    await asyncio.to_thread(store.put_many, items)
+
+
+async def plan_shards(fetch_first, repo, start, end, extra='', first=None):
+    """
+    Split the created window [start, end] until each window's search result
+    fits under SEARCH_CAP. fetch_first(query) returns page 1 of a query, so
+    every probe doubles as the first page of its shard.
+    Returns [(query, page1_data), ...] in chronological order.
+    """
+    query = window_query(repo, start, end, extra)
+    if first is None:
+        first = await fetch_first(query)
+    total = first.get('total_count', 0)
+    if total <= SEARCH_CAP:
+        return [(query, first)]
+    if end - start < timedelta(seconds=2):
+        print(f"  [{repo}] WARNING: {total} issues created in {query!r}, "
+              f"only {SEARCH_CAP} retrievable", file=sys.stderr)
+        return [(query, first)]
+
+    mid = (start + (end - start) / 2).replace(microsecond=0)
+    lower, upper = await asyncio.gather(
+        plan_shards(fetch_first, repo, start, mid, extra),
+        plan_shards(fetch_first, repo, mid + timedelta(seconds=1), end, extra),
+    )
+    return lower + upper
+
+
+def unseen_rows(rows, seen):
+    """Rows whose (Project, IssueID) is not in `seen` yet; records them there."""
+    fresh = []
+    for row in rows:
+        key = (row['Project'], row['IssueID'])
+        if key not in seen:
+            seen.add(key)
+            fresh.append(row)
+    return fresh
+
+
+class PageOrder:
+    """
+    Hands pages to `write` in (shard, page) order, whatever order they are
+    fetched in, so a run writes the same file online and from the cache. A
+    page waits until every page before it is written; pages count from 1.
+    """
+
+    def __init__(self, write):
+        self.write = write
+        self.waiting = {}
+        self.next = (0, 1)
+
+    def put(self, shard, page, last, data):
+        self.waiting[shard, page] = (last, data)
+        while self.next in self.waiting:
+            last, data = self.waiting.pop(self.next)
+            self.write(data)
+            shard, page = self.next
+            self.next = (shard + 1, 1) if last else (shard, page + 1)
+
+
+async def scrape_repo(client, repo, store, sink, created=CREATED_RANGE):
+    """
+    Scrape all issues of one repo created in `created`; bodies go to the
+    body store, rows to `sink` page by page in (window, page) order (an
+    issue seen on an earlier page is skipped). Returns the number of rows written.
+    """
+    seen = set()
+    order = PageOrder(lambda issues: sink.write_rows(
+        unseen_rows((issue_to_row(repo, issue) for issue in issues), seen)))
+
+    async def fetch_first(query):
+        return await fetch_search_page(client, query, 1)
+
+    async def fetch_and_save(shard, query, page, last, data=None):
+        if data is None:
+            data = await fetch_search_page(client, query, page)
+        issues = data.get('items', [])
+        await save_bodies(store, repo, issues)
+        order.put(shard, page, last, issues)
+
+    start, end = parse_created_range(created)
+    shards = await plan_shards(fetch_first, repo, start, end)
+    print(f"  [{repo}] {len(shards)} window(s), "
+          f"{sum(first.get('total_count', 0) for _, first in shards)} issues", file=sys.stderr)
+
+    tasks = []
+    for shard, (query, first) in enumerate(shards):
+        last = n_pages(first['total_count'])
+        tasks.append(fetch_and_save(shard, query, 1, last == 1, first))
+        tasks.extend(fetch_and_save(shard, query, page, page == last) for page in range(2, last + 1))
+    n_before = sink.n_rows
+    await asyncio.gather(*tasks)
+    return sink.n_rows - n_before
+
+
+def write_csv(issues, filename='github_issues.csv'):
+    with CsvSink(filename, atomic=True) as sink:
+        sink.write_rows(issues)
+
+
+def compact_csv(filename='github_issues.csv'):
+    """Deduplicate rows by IssueID, keeping the last (= most recently fetched) occurrence."""
+    with open(filename, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    latest = {}
+    for row in rows:
+        latest.pop(row['IssueID'], None)
+        latest[row['IssueID']] = row
+    write_csv(list(latest.values()), filename)
+    return len(latest)
+
+
+async def scrape_repo_incremental(client, repo, target_dir, store):
+    """
+    Fetch only issues updated since the last completed run of this repo and
+    append them to target_dir/github_issues.csv and the body store.
+    Resumes an interrupted run. Returns the number of issues written in this call.
+    """
+    csv_path = os.path.join(target_dir, 'github_issues.csv')
+    os.makedirs(target_dir, exist_ok=True)
+
+    cp = Checkpoint.load(target_dir, repo)
+
+    async def fetch(query, page, conditional=False):
+        params = search_params(query, page, sort='updated')
+        key = request_key('search/issues', params)
+        data, new_etag = await client.get_json('search/issues', params,
+                                               cp.etags.get(key) if conditional else None)
+        if new_etag:
+            cp.etags[key] = new_etag
+        return data
+
+    async def fetch_first(query):
+        return await fetch(query, 1)
+
+    firsts = {}
+    if cp.resumable:
+        print(f"  [{repo}] resuming run ({cp.n_shards_done()} of {len(cp.pending['shards'])} "
+              f"windows already done)", file=sys.stderr)
+    else:
+        start, end = parse_created_range()
+        extra = f" updated:>={cp.last_updated_at}" if cp.last_updated_at else ''
+        root = window_query(repo, start, end, extra)
+        # only the root probe is conditional: a 304 there means nothing changed at all
+        first = await fetch(root, 1, conditional=True)
+        if first is None:
+            print(f"  [{repo}] not modified since last run", file=sys.stderr)
+            return 0
+        shards = await plan_shards(fetch_first, repo, start, end, extra, first)
+        firsts = dict(shards)
+        cp.start_run(root, [query[:len(query) - len(extra)] for query, _ in shards])
+
+    written = 0
+
+    async def sweep(query):
+        """Page one shard by its updated_at cursor until a page comes back short."""
+        nonlocal written
+        shard, page = cp.pending['shards'][query], 1
+        while not shard['done']:
+            cursor_query = query + (f" updated:>={shard['cursor']}" if shard['cursor'] else '')
+            data = firsts.pop(cursor_query, None) if page == 1 else None
+            data = data or await fetch(cursor_query, page)
+            issues = data.get('items', [])
+            seen = {tuple(pair) for pair in shard['seen']}
+            fresh = [i for i in issues if (str(i['number']), i.get('updated_at')) not in seen]
+            await save_bodies(store, repo, fresh)
+            sink.write_rows(issue_to_row(repo, issue) for issue in fresh)
+            full = len(issues) == PER_PAGE
+            # a full page of issues already written at the cursor's timestamp: step past it by offset
+            page = page + 1 if full and not fresh else 1
+            cp.page_done(query, fresh, done=not full)
+            written += len(fresh)
+
+    with CsvSink(csv_path, append=True) as sink:
+        await asyncio.gather(*(sweep(query) for query in cp.pending['shards']))
+
+    cp.finish_run(changed=written > 0)
+    n_total = compact_csv(csv_path) if os.path.exists(csv_path) else 0
+    print(f"  [{repo}] {written} new/updated issues, {n_total} in CSV", file=sys.stderr)
+    return written
+
+
+async def scrape_all(repos, out_dir='.', api_url=API_URL, tokens=None, per_host=PER_HOST,
+                     incremental=False, store_path=None, backend='rest', sink='csv',
+                     cache_path=None, offline=False):
+    """
+    Scrape all repos in parallel over one connection pool.
+    Returns {repo: n_issues} for successful repos and {repo: exception} for failed ones.
+    """
+    async def run(repo):
+        target_dir = repo_dir(out_dir, repo)
+        if incremental:
+            return await scrape_repo_incremental(client, repo, target_dir, store)
+        os.makedirs(target_dir, exist_ok=True)
+        # the previous output stays in place until this run has finished
+        with open_sink(os.path.join(target_dir, f'github_issues.{sink}'), atomic=True) as rows:
+            if backend == 'graphql':
+                from graphql_backend import scrape_repo_graphql
+                details_path = os.path.join(target_dir, 'issue_details.jsonl')
+                return await scrape_repo_graphql(client, repo, store, rows, details_path)
+            return await scrape_repo(client, repo, store, rows)
+
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    cache_path = cache_path or os.path.join(out_dir, CACHE_FILE)
+    if offline and not os.path.exists(cache_path):
+        raise FileNotFoundError(f"no response cache at {cache_path}")
+    with BodyStore(store_path or os.path.join(out_dir, STORE_FILE)) as store, \
+            ResponseCache(cache_path) as cache:
+        async with GitHubClient(api_url, tokens, per_host, cache, offline) as client:
+            results = await asyncio.gather(*(run(repo) for repo in repos), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    done, failed = {}, {}
+    for repo, result in zip(repos, results):
+        if isinstance(result, BaseException):
+            failed[repo] = result
+        else:
+            done[repo] = result
+
+    rate = client.pages / elapsed if elapsed > 0 else float('inf')
+    print(f"Fetched {client.pages} pages in {elapsed:.1f}s ({rate:.1f} pages/sec), "
+          f"{client.not_modified} not modified, {cache.hits} from cache, "
+          f"{client.scheduler.limited} rate-limited "
+          f"({client.scheduler.waited:.1f}s total wait across requests)", file=sys.stderr)
+    return done, failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape GitHub bug issues for several repos in parallel.")
+    parser.add_argument('--repo', action='append', dest='repos',
+                        help="OWNER/NAME (repeatable, default: all configured repos)")
+    parser.add_argument('--out-dir', default='.', help="output root (one subfolder per repo)")
+    parser.add_argument('--api-url', default=API_URL, help="GitHub API base URL (e.g. a local stand-in server)")
+    parser.add_argument('--per-host', type=int, default=PER_HOST, help="max concurrent connections per host")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only fetch issues updated since the last run (checkpointed, resumable)")
+    parser.add_argument('--store', help=f"issue body store (default: OUT_DIR/{STORE_FILE})")
+    parser.add_argument('--backend', choices=['rest', 'graphql'], default='rest',
+                        help="rest: search API; graphql: issues plus comments/labels/timeline")
+    parser.add_argument('--sink', choices=['csv', 'jsonl', 'sqlite'], default='csv',
+                        help="format of the per-repo github_issues.* file")
+    parser.add_argument('--cache', help=f"HTTP response cache (default: OUT_DIR/{CACHE_FILE})")
+    parser.add_argument('--offline', action='store_true',
+                        help="no network: rebuild the outputs from cached responses only")
+    args = parser.parse_args(argv)
+    if args.incremental and args.offline:
+        parser.error("--incremental needs the network; replay a full run with --offline instead")
+    if args.offline and not os.path.exists(args.cache or os.path.join(args.out_dir, CACHE_FILE)):
+        parser.error(f"--offline needs an existing response cache (--cache or OUT_DIR/{CACHE_FILE})")
+    if args.incremental and args.backend == 'graphql':
+        parser.error("--incremental is only supported with the rest backend")
+    if args.incremental and args.sink != 'csv':
+        parser.error("--incremental appends to github_issues.csv; use --sink csv")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    repos = args.repos or REPOS
+    tokens = tokens_from_env()
+
+    done, failed = asyncio.run(scrape_all(repos, args.out_dir, args.api_url, tokens, args.per_host,
+                                          incremental=args.incremental, store_path=args.store,
+                                          backend=args.backend, sink=args.sink,
+                                          cache_path=args.cache, offline=args.offline))
+
+    for repo, n in done.items():
+        print(f"{repo}: {n} issues -> {repo_dir(args.out_dir, repo)}", file=sys.stderr)
+    for repo, exc in failed.items():
+        print(f"{repo}: FAILED ({exc})", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+graphql_backend.py
+GraphQL fetch backend: issues with comments, labels, label history and
+cross-referenced PRs in one round trip per page.
+
+The REST search only returns title/state/body; everything else would cost
+extra requests per issue. Here one `search` query pages through the issues
+of a created-window shard together with their nested connections. The page
+size is derived from the node limit and the nested page sizes. A nested
+connection that does not fit on its first page (a busy issue with many
+comments, labels or timeline events) is paged to the end with follow-up
+`node(id:)` queries, so no label event or cross-referenced PR is dropped;
+the details record each connection's totalCount.
+
+GitHub reports an exhausted GraphQL rate limit as HTTP 200 with
+errors[].type == "RATE_LIMITED"; the client hands those to the rate-limit
+scheduler and retries (see GitHubClient.request). Other errors are fatal.
+
+Output is the same as the REST path (github_issues.csv rows, bodies in the
+body store) plus OUT_DIR/<owner>__<name>/issue_details.jsonl with the nested
+data, one JSON object per issue.
+
+Usage:
+    python github_issues_scraper.py --backend graphql [...]
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+
+from github_issues_scraper import (CREATED_RANGE, GitHubError, PageOrder, issue_to_row, parse_created_range,
+                                   plan_shards, save_bodies, unseen_rows)
+from sinks import JsonlSink
+
+NODE_LIMIT = 500_000  # GitHub's limit on nodes a single query may request
+MAX_FIRST = 100
+COMMENTS = 50
+LABELS = 20
+EVENTS = 50
+
+# nested connections of an issue: (extra arguments, fields of one node)
+NESTED = {
+    'labels': ('', 'name'),
+    'comments': ('', 'author { login } createdAt body'),
+    'timelineItems': (', itemTypes: [CROSS_REFERENCED_EVENT, LABELED_EVENT, UNLABELED_EVENT]', """
+            __typename
+            ... on CrossReferencedEvent {
+              createdAt
+              source { ... on PullRequest { number url state merged } }
+            }
+            ... on LabeledEvent { createdAt label { name } }
+            ... on UnlabeledEvent { createdAt label { name } }"""),
+}
+
+
+def nested_connection(name, first, after=''):
+    args, fields = NESTED[name]
+    return (f"{name}(first: {first}{after}{args}) {{\n"
+            f"          totalCount\n          pageInfo {{ hasNextPage endCursor }}\n"
+            f"          nodes {{ {fields} }}\n        }}")
+
+
+QUERY = """
+query($q: String!, $first: Int!, $after: String, $comments: Int!, $labels: Int!, $events: Int!) {
+  rateLimit { cost remaining resetAt }
+  search(query: $q, type: ISSUE, first: $first, after: $after) {
+    issueCount
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on Issue {
+        id number url title state createdAt updatedAt closedAt body
+        %s
+        %s
+        %s
+      }
+    }
+  }
+}
+""" % (nested_connection('labels', '$labels'), nested_connection('comments', '$comments'),
+       nested_connection('timelineItems', '$events'))
+
+# follow-up query: the next page of one nested connection of one issue
+NODE_QUERY = """
+query($id: ID!, $first: Int!, $after: String) {
+  rateLimit { cost remaining resetAt }
+  node(id: $id) {
+    ... on Issue {
+        %s
+    }
+  }
+}
+"""
+
+
+def page_size(comments=COMMENTS, labels=LABELS, events=EVENTS, node_limit=NODE_LIMIT):
+    """Largest `first` whose worst-case node count stays under node_limit."""
+    per_issue = 1 + comments + labels + events
+    return max(1, min(MAX_FIRST, node_limit // per_issue))
+
+
+def node_to_issue(node):
+    """GraphQL Issue node -> the REST field names issue_to_row() expects."""
+    return {
+        'number': node['number'],
+        'html_url': node['url'],
+        'title': node['title'],
+        'state': node['state'].lower(),
+        'created_at': node['createdAt'],
+        'updated_at': node['updatedAt'],
+        'body': node.get('body') or '',
+    }
+
+
+def node_to_details(repo, node):
+    events = node['timelineItems']['nodes']
+    return {
+        'Project': repo,
+        'IssueID': str(node['number']),
+        'closed_at': node.get('closedAt'),
+        'labels_total': node['labels']['totalCount'],
+        'labels': [label['name'] for label in node['labels']['nodes']],
+        'timeline_total': node['timelineItems']['totalCount'],
+        'label_events': [
+            {'action': 'labeled' if e['__typename'] == 'LabeledEvent' else 'unlabeled',
+             'label': e['label']['name'], 'at': e['createdAt']}
+            for e in events if e['__typename'] in ('LabeledEvent', 'UnlabeledEvent')
+        ],
+        'linked_prs': [
+            {**e['source'], 'at': e['createdAt']}
+            for e in events if e['__typename'] == 'CrossReferencedEvent' and e.get('source')
+        ],
+        'comments_total': node['comments']['totalCount'],
+        'comments': [
+            {'author': (c.get('author') or {}).get('login'), 'at': c['createdAt'], 'body': c['body']}
+            for c in node['comments']['nodes']
+        ],
+    }
+
+
+async def graphql(client, query, variables):
+    """POST one GraphQL query and return its `data`; errors other than rate limits are fatal."""
+    data = await client.post_json('graphql', {'query': query, 'variables': variables})
+    if data.get('errors'):
+        raise GitHubError(200, '; '.join(e.get('message', '') for e in data['errors']))
+    return data['data']
+
+
+async def fetch_rest(client, node, name):
+    """Page the rest of node's nested connection `name` into its nodes, one follow-up query per page."""
+    conn = node[name]
+    while conn['pageInfo']['hasNextPage']:
+        variables = {'id': node['id'], 'first': MAX_FIRST, 'after': conn['pageInfo']['endCursor']}
+        more = (await graphql(client, NODE_QUERY % nested_connection(name, '$first', ', after: $after'),
+                              variables))['node'][name]
+        conn['nodes'].extend(more['nodes'])
+        conn['pageInfo'] = more['pageInfo']
+
+
+async def fetch_graphql_page(client, query, after=None, first=None,
+                             comments=COMMENTS, labels=LABELS, events=EVENTS):
+    """
+    One search page. Returns a dict shaped like a REST search page
+    ('total_count', 'items' as REST-like issues) plus 'nodes', 'cursor', 'has_next'.
+    """
+    variables = {
+        'q': query, 'first': first or page_size(comments, labels, events), 'after': after,
+        'comments': comments, 'labels': labels, 'events': events,
+    }
+    search = (await graphql(client, QUERY, variables))['search']
+    nodes = [n for n in search['nodes'] if n]  # non-Issue results come back empty
+    await asyncio.gather(*(fetch_rest(client, node, name) for node in nodes for name in NESTED
+                           if node[name]['pageInfo']['hasNextPage']))
+    return {
+        'total_count': search['issueCount'],
+        'items': [node_to_issue(n) for n in nodes],
+        'nodes': nodes,
+        'cursor': search['pageInfo']['endCursor'],
+        'has_next': search['pageInfo']['hasNextPage'],
+    }
+
+
+async def scrape_repo_graphql(client, repo, store, sink, details_path, created=CREATED_RANGE):
+    """
+    GraphQL counterpart of scrape_repo(): same rows and body store writes,
+    nested data streamed to details_path page by page. Returns the number
+    of rows written to `sink`.
+    """
+    async def fetch_first(query):
+        return await fetch_graphql_page(client, query)
+
+    start, end = parse_created_range(created)
+    shards = await plan_shards(fetch_first, repo, start, end)
+    print(f"  [{repo}] {len(shards)} window(s), "
+          f"{sum(first['total_count'] for _, first in shards)} issues (graphql)", file=sys.stderr)
+
+    seen = set()
+
+    def write(page):
+        rows = unseen_rows((issue_to_row(repo, issue) for issue in page['items']), seen)
+        fresh = {row['IssueID'] for row in rows}
+        sink.write_rows(rows)
+        details.write_rows(node_to_details(repo, node) for node in page['nodes'] if str(node['number']) in fresh)
+
+    order = PageOrder(write)
+
+    async def run_shard(shard, query, page):
+        # cursors are sequential within a shard; shards run concurrently
+        for number in itertools.count(1):
+            await save_bodies(store, repo, page['items'])
+            order.put(shard, number, not page['has_next'], page)
+            if not page['has_next']:
+                return
+            page = await fetch_graphql_page(client, query, page['cursor'])
+
+    os.makedirs(os.path.dirname(details_path) or '.', exist_ok=True)
+    n_before = sink.n_rows
+    with JsonlSink(details_path, atomic=True) as details:
+        await asyncio.gather(*(run_shard(shard, query, first) for shard, (query, first) in enumerate(shards)))
+    return sink.n_rows - n_before
@@ -0,0 +1,114 @@
+"""
+rate_limit.py
+Rate-limit-aware request scheduler for the GitHub API, rotating over several tokens.
+
+Every credential keeps its own bucket, seeded and corrected from the
+`X-RateLimit-Limit/Remaining/Reset` headers of each response and decremented
+locally per in-flight request, so concurrent requests do not overdraw a token. acquire()
+hands out the token with the most budget left; when all are empty it sleeps
+until the earliest reset instead of failing.
+
+403/429 responses are classified as
+- primary limit (remaining == 0): block the token until X-RateLimit-Reset
+- secondary limit with Retry-After: block the token for that many seconds
+- secondary limit without Retry-After: exponential backoff with full jitter
+and the request is retried on the next available token. A 403 counts as a
+rate limit only if remaining == 0, Retry-After is set or the body mentions a
+secondary rate limit; GitHub sends X-RateLimit-* on every response, so any
+other 403 (no permission, blocked resource) is returned to the caller at once.
+"""
+
+import asyncio
+import random
+import time
+
+UNKNOWN_BUDGET = 1  # one probe request per token until its first response
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 300.0
+
+
+class TokenBucket:
+    def __init__(self, token):
+        self.token = token
+        self.limit = None
+        self.remaining = UNKNOWN_BUDGET
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.secondary_hits = 0
+        self.inflight = 0
+
+    def available(self, now):
+        if self.blocked_until > now:
+            return 0
+        if self.remaining <= 0 and self.reset_at is not None and self.reset_at <= now:
+            # window rolled over without us seeing a response
+            self.remaining = self.limit or UNKNOWN_BUDGET
+        return self.remaining
+
+    def ready_at(self, now):
+        if self.blocked_until > now:
+            return self.blocked_until
+        if self.remaining <= 0:
+            # before the first response the probe is still in flight: poll
+            return now + 0.05 if self.reset_at is None else max(self.reset_at, now)
+        return now
+
+
+class RateLimitScheduler:
+    def __init__(self, tokens=None, max_retries=8, clock=time.time):
+        self.buckets = [TokenBucket(t) for t in (tokens or [None])]
+        self.max_retries = max_retries
+        self.clock = clock
+        self.waited = 0.0
+        self.limited = 0
+
+    async def acquire(self):
+        """Return the bucket with the most budget left, waiting if all are exhausted."""
+        while True:
+            now = self.clock()
+            best = max(self.buckets, key=lambda b: b.available(now))
+            if best.available(now) > 0:
+                best.remaining -= 1
+                best.inflight += 1
+                return best
+            wake = min(b.ready_at(now) for b in self.buckets)
+            delay = max(wake - now, 0.05)
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def update(self, bucket, status, headers, body=''):
+        """
+        Feed a response back into the bucket. Returns True if the request hit
+        a rate limit and should be retried. body (the text of a 403) tells
+        secondary limits without Retry-After from other 403s.
+        """
+        now = self.clock()
+        bucket.inflight -= 1
+        if 'X-RateLimit-Remaining' in headers:
+            # the server has not seen our other in-flight requests yet
+            bucket.remaining = int(headers['X-RateLimit-Remaining']) - bucket.inflight
+        elif bucket.limit is None and status < 400:
+            bucket.remaining = float('inf')  # server does not report limits for this token
+        if 'X-RateLimit-Limit' in headers:
+            bucket.limit = int(headers['X-RateLimit-Limit'])
+        if 'X-RateLimit-Reset' in headers:
+            bucket.reset_at = float(headers['X-RateLimit-Reset'])
+
+        if status not in (403, 429):
+            bucket.secondary_hits = 0
+            return False
+        exhausted = headers.get('X-RateLimit-Remaining') == '0'
+        if (status == 403 and not exhausted and 'Retry-After' not in headers
+                and 'secondary rate limit' not in body.lower()):
+            return False  # permission error or blocked resource, not a rate limit
+
+        self.limited += 1
+        if 'Retry-After' in headers:
+            bucket.blocked_until = now + float(headers['Retry-After'])
+        elif exhausted and bucket.reset_at is not None:
+            bucket.blocked_until = bucket.reset_at + 1
+        else:
+            bucket.secondary_hits += 1
+            cap = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** bucket.secondary_hits)
+            bucket.blocked_until = now + random.uniform(0, cap)
+        return True
@@ -0,0 +1,122 @@
+"""
+response_cache.py
+Content-addressed on-disk cache of GitHub API responses.
+
+Every 200 response is stored as the raw JSON bytes, zlib-compressed, under
+the SHA-256 of those bytes; a second table maps the request key (method,
+URL, sorted params, hash of the POST payload) to that hash plus the ETag.
+Identical pages (e.g. an unchanged result fetched again) are stored once.
+
+Online, a cached entry is revalidated with If-None-Match, so an unchanged
+page costs a 304 instead of a full download. With --offline the scraper
+never touches the network and answers every request from the cache, which
+rebuilds github_issues.csv and the body store exactly from the recorded
+responses.
+
+Usage:
+    python github_issues_scraper.py --offline [--cache PATH] [...]
+    python response_cache.py stats [--cache PATH]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+CACHE_FILE = 'http_cache.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    key        TEXT PRIMARY KEY,
+    hash       TEXT NOT NULL REFERENCES blobs(hash),
+    etag       TEXT,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def cache_key(method, url, params=None, payload=None):
+    key = f"{method} {url}"
+    if params:
+        key += '?' + '&'.join(f"{k}={params[k]}" for k in sorted(params))
+    if payload is not None:
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        key += ' #' + hashlib.sha256(body).hexdigest()
+    return key
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def put(self, key, raw, etag=None):
+        """raw: response body as bytes. Returns its content hash."""
+        digest = hashlib.sha256(raw).hexdigest()
+        self.conn.execute('INSERT OR IGNORE INTO blobs VALUES (?, ?)', (digest, zlib.compress(raw)))
+        self.conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)',
+                          (key, digest, etag, time.time()))
+        self.conn.commit()
+        return digest
+
+    def etag(self, key):
+        row = self.conn.execute('SELECT etag FROM responses WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def get(self, key):
+        """Parsed JSON of the cached response for key, or None."""
+        row = self.conn.execute('SELECT b.data FROM responses r JOIN blobs b ON b.hash = r.hash '
+                                'WHERE r.key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def stats(self):
+        n_responses = self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        n_blobs, stored = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) '
+                                            'FROM blobs').fetchone()
+        return {'responses': n_responses, 'blobs': n_blobs, 'compressed_bytes': stored}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed GitHub API response cache.")
+    parser.add_argument('--cache', default=CACHE_FILE, help="cache file (default: %(default)s)")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('stats', help="number of cached responses and distinct bodies")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.cache):
+        print(f"No cache at {args.cache}", file=sys.stderr)
+        return 1
+    with ResponseCache(args.cache) as cache:
+        stats = cache.stats()
+    print(f"Responses: {stats['responses']}")
+    print(f"Distinct bodies: {stats['blobs']} ({stats['compressed_bytes']} bytes compressed, "
+          f"{os.path.getsize(args.cache)} bytes on disk)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+scrape_state.py
+Per-repo checkpoint for incremental / resumable scraping.
+
+The checkpoint is a small JSON file next to the repo's output:
+- last_updated_at: start of the last *completed* run (minus CLOCK_SKEW);
+  every issue updated before it has been fetched
+- etags: ETag per request key (conditional requests, 304 = unchanged)
+- pending: the run in progress (root query, start time, and per date-window
+  shard its updated_at cursor, the (IssueID, updated_at) pairs already
+  written at that cursor, and whether the shard is done). Present only
+  while a run is unfinished, so an interrupted run resumes every shard at
+  its cursor.
+
+A shard is paged by its cursor, not by page number: each request asks for
+`updated:>=<cursor>` sorted by update, and the cursor moves to the newest
+updated_at written. An issue updated during the run (or between an
+interrupt and the resume) only moves past the cursor and is fetched again;
+with offset paging it would shift an unfetched issue onto a page already
+marked done.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+STATE_FILE = '.scrape_state.json'
+CLOCK_SKEW = timedelta(minutes=5)  # our clock against GitHub's; re-fetching that much is harmless
+
+
+def request_key(path, params):
+    return path + '?' + '&'.join(f"{k}={params[k]}" for k in sorted(params))
+
+
+class Checkpoint:
+    def __init__(self, path, repo):
+        self.path = path
+        self.repo = repo
+        self.last_updated_at = None
+        self.etags = {}
+        self.pending = None
+
+    @classmethod
+    def load(cls, target_dir, repo):
+        path = os.path.join(target_dir, STATE_FILE)
+        cp = cls(path, repo)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            cp.last_updated_at = data.get('last_updated_at')
+            cp.etags = data.get('etags', {})
+            cp.pending = data.get('pending')
+        return cp
+
+    def save(self):
+        data = {
+            'repo': self.repo,
+            'last_updated_at': self.last_updated_at,
+            'etags': self.etags,
+            'pending': self.pending,
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    @property
+    def resumable(self):
+        # runs checkpointed with page numbers (no cursors) are started over
+        return bool(self.pending) and 'started_at' in self.pending
+
+    def start_run(self, root_query, shard_queries):
+        """shard_queries: the created-window query of every shard, without an updated: qualifier."""
+        started = datetime.now(timezone.utc) - CLOCK_SKEW
+        self.pending = {
+            'query': root_query,
+            'started_at': started.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'shards': {q: {'cursor': self.last_updated_at, 'seen': [], 'done': False} for q in shard_queries},
+        }
+        self.save()
+
+    def n_shards_done(self):
+        if not self.pending:
+            return 0
+        return sum(shard['done'] for shard in self.pending['shards'].values())
+
+    def page_done(self, query, issues, done):
+        """Record the issues written from one page of a shard; the cursor moves to the newest updated_at."""
+        shard = self.pending['shards'][query]
+        # ISO-8601 UTC timestamps compare correctly as strings
+        newest = max((i['updated_at'] for i in issues if i.get('updated_at')), default=None)
+        if newest and newest != shard['cursor']:
+            shard['cursor'], shard['seen'] = newest, []
+        shard['seen'] += [[str(i['number']), newest] for i in issues if newest and i.get('updated_at') == newest]
+        shard['done'] = done
+        self.save()
+
+    def finish_run(self, changed=True):
+        query = self.pending['query']
+        if changed:
+            # an unchanged run keeps its query, so the next root probe can still get a 304
+            self.last_updated_at = self.pending['started_at']
+        self.pending = None
+        # ETags of older queries can never match again
+        self.etags = {k: v for k, v in self.etags.items() if f"q={query}&" in k}
+        self.save()
@@ -0,0 +1,121 @@
+"""
+sinks.py
+Row sinks for the scrapers: each page's rows are written (and flushed) as
+soon as they arrive, so memory stays constant; in append mode a crash
+keeps every page written so far.
+
+- CsvSink:    github_issues.csv as before (header once, append mode optional)
+- JsonlSink:  one JSON object per row
+- SqliteSink: table `issues`, upsert on (Project, IssueID)
+
+open_sink(path) picks the sink from the file extension. With atomic=True a
+sink writes to <path>.partial and moves it onto path only when it is closed
+without an error. A failed or aborted run leaves the previous output in
+place and keeps what it wrote as <path>.failed (replacing the one of an
+earlier failure), so the rows fetched before the error are not lost.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+FIELDNAMES = ['Project', 'IssueID', 'URL', 'Title', 'Status', 'CreatedAt']
+PARTIAL_SUFFIX = '.partial'
+FAILED_SUFFIX = '.failed'
+
+
+class Sink:
+    def __init__(self, path, append=False, atomic=False):
+        if append and atomic:
+            raise ValueError("an appending sink cannot be atomic")
+        self.n_rows = 0
+        self.final_path = path
+        self.path = path + PARTIAL_SUFFIX if atomic else path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close()
+        if self.path == self.final_path:
+            return
+        if exc_type is None:
+            os.replace(self.path, self.final_path)
+        elif os.path.exists(self.path):
+            failed_path = self.final_path + FAILED_SUFFIX
+            os.replace(self.path, failed_path)
+            print(f"  kept {self.n_rows} rows of the failed run in {failed_path}", file=sys.stderr)
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvSink(Sink):
+    def __init__(self, path, fieldnames=FIELDNAMES, append=False, atomic=False):
+        super().__init__(path, append, atomic)
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(self.path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.f, fieldnames=fieldnames)
+        if new_file:
+            self.writer.writeheader()
+
+    def write_rows(self, rows):
+        rows = list(rows)
+        self.writer.writerows(rows)
+        self.f.flush()
+        self.n_rows += len(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class JsonlSink(Sink):
+    def __init__(self, path, append=False, atomic=False):
+        super().__init__(path, append, atomic)
+        self.f = open(self.path, 'a' if append else 'w', encoding='utf-8')
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            self.n_rows += 1
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class SqliteSink(Sink):
+    def __init__(self, path, fieldnames=FIELDNAMES, append=False, atomic=False):
+        super().__init__(path, append, atomic)
+        self.fieldnames = fieldnames
+        self.conn = sqlite3.connect(self.path)
+        cols = ', '.join(f'"{c}" TEXT' for c in fieldnames)
+        if not append:
+            self.conn.execute('DROP TABLE IF EXISTS issues')
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS issues ({cols}, PRIMARY KEY ("Project", "IssueID"))')
+        placeholders = ', '.join('?' for _ in fieldnames)
+        self.insert = f'INSERT OR REPLACE INTO issues VALUES ({placeholders})'
+
+    def write_rows(self, rows):
+        values = [tuple(row.get(c) for c in self.fieldnames) for row in rows]
+        self.conn.executemany(self.insert, values)
+        self.conn.commit()
+        self.n_rows += len(values)
+
+    def close(self):
+        self.conn.close()
+
+
+SINKS = {'.csv': CsvSink, '.jsonl': JsonlSink, '.sqlite': SqliteSink, '.db': SqliteSink}
+
+
+def open_sink(path, append=False, atomic=False):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SINKS:
+        raise ValueError(f"no sink for {path!r} (known: {', '.join(SINKS)})")
+    return SINKS[ext](path, append=append, atomic=atomic)
@@ -0,0 +1,49 @@
+"""Classification of 403/429 responses in rate_limit.RateLimitScheduler (run with pytest)."""
+
+import asyncio
+
+from rate_limit import BASE_BACKOFF, RateLimitScheduler
+
+NOW = 1_000_000.0
+HEADERS = {'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999',
+           'X-RateLimit-Reset': str(int(NOW) + 3600)}
+
+
+def acquired(scheduler):
+    return asyncio.run(scheduler.acquire())
+
+
+def test_plain_403_with_rate_limit_headers_is_not_retried():
+    scheduler = RateLimitScheduler(['t'], clock=lambda: NOW)
+    bucket = acquired(scheduler)
+    body = '{"message": "Resource not accessible by personal access token"}'
+    assert scheduler.update(bucket, 403, HEADERS, body) is False
+    assert scheduler.limited == 0
+    assert bucket.blocked_until == 0.0
+
+
+def test_primary_limit_blocks_until_reset():
+    scheduler = RateLimitScheduler(['t'], clock=lambda: NOW)
+    bucket = acquired(scheduler)
+    assert scheduler.update(bucket, 403, {**HEADERS, 'X-RateLimit-Remaining': '0'}) is True
+    assert bucket.blocked_until == NOW + 3600 + 1
+
+
+def test_secondary_limit_from_body_or_retry_after():
+    scheduler = RateLimitScheduler(['t'], clock=lambda: NOW)
+    bucket = acquired(scheduler)
+    body = '{"message": "You have exceeded a secondary rate limit."}'
+    assert scheduler.update(bucket, 403, HEADERS, body) is True
+    assert NOW <= bucket.blocked_until <= NOW + 2 * BASE_BACKOFF
+
+    scheduler = RateLimitScheduler(['t'], clock=lambda: NOW)
+    bucket = acquired(scheduler)
+    assert scheduler.update(bucket, 403, {'Retry-After': '30'}) is True
+    assert bucket.blocked_until == NOW + 30
+
+
+def test_exhausted_before_any_reset_header_backs_off():
+    scheduler = RateLimitScheduler(['t'], clock=lambda: NOW)
+    bucket = acquired(scheduler)
+    assert scheduler.update(bucket, 429, {'X-RateLimit-Remaining': '0'}) is True
+    assert NOW <= bucket.blocked_until <= NOW + 2 * BASE_BACKOFF